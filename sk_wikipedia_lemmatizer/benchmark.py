@@ -0,0 +1,268 @@
+import os
+import re
+import html
+import json
+import time
+import random
+import filecmp
+import argparse
+import platform
+import datetime
+import tempfile
+from lemmatizer import WikiLemmatizer, MultiprocessWikiLemmatizer
+from index import IndexLemma, IndexNonLemma
+from levenshtein import calc_modified_levenshtein_distance
+from corpus_generator import SyntheticWikiCorpus
+from lemma_pair_storage import write_lemma_pairs
+from normalizer import find_links, remove_disambiguation, normalize_line, contains_ascii_letters
+
+
+
+def time_call(function, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    return (time.perf_counter() - start_time, result)
+
+
+def benchmark_multiprocess_lemmatizer(input_file_path, process_count_list=None):
+    if (process_count_list is None):
+        process_count_list = [1, 2, 4, 8, 16, 32]
+    results = []
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        serial_output_file_path = os.path.join(output_dir, 'serial.csv')
+        serial_time, _ = time_call(WikiLemmatizer().lemmatize, input_file_path, serial_output_file_path)
+        results.append({'lemmatizer': 'WikiLemmatizer', 'processes': 1, 'seconds': serial_time, 'speedup': 1.0, 'identical_output': True})
+
+        for process_count in process_count_list:
+            output_file_path = os.path.join(output_dir, f'multiprocess_{process_count}.csv')
+            elapsed_time, _ = time_call(MultiprocessWikiLemmatizer(process_count).lemmatize, input_file_path, output_file_path)
+            results.append({
+                'lemmatizer': 'MultiprocessWikiLemmatizer',
+                'processes': process_count,
+                'seconds': elapsed_time,
+                'speedup': serial_time / elapsed_time,
+                'identical_output': filecmp.cmp(serial_output_file_path, output_file_path, shallow=False)
+            })
+
+    for result in results:
+        print(f"{result['lemmatizer']:<28} processes: {result['processes']:>3}  time: {result['seconds']:.2f} s  "
+              f"speedup: {result['speedup']:.2f}x  identical output: {result['identical_output']}")
+
+    return results
+
+
+def _legacy_parse_and_clean_line(line):
+    # per-line work of the lemmatizer before the normalizer module was introduced
+    cleaned_line_list = []
+
+    for match in re.findall('\\[\\[([^|\\]]+)\\|?([^|\\]]+)?\\]\\]([a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ]+)?', line):
+        link = re.sub('\\(.*\\)', '', match[0])
+        parsed_line = link + '|' + (match[1] or link + match[2]) if (match[1] or match[2]) else link
+        parsed_line = html.unescape(parsed_line)
+        parsed_line = parsed_line.replace('&nbsp;', ' ').replace('&amp;', ' ')
+        parsed_line = re.sub('[^a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ|]+', ' ', parsed_line).strip()
+        if (parsed_line and re.search('[a-zA-Z]', parsed_line)):
+            cleaned_line_list.append(parsed_line)
+
+    return cleaned_line_list
+
+
+def _parse_and_clean_line(line):
+    cleaned_line_list = []
+
+    for match in find_links(line):
+        link = remove_disambiguation(match[0])
+        parsed_line = link + '|' + (match[1] or link + match[2]) if (match[1] or match[2]) else link
+        parsed_line = normalize_line(parsed_line)
+        if (contains_ascii_letters(parsed_line)):
+            cleaned_line_list.append(parsed_line)
+
+    return cleaned_line_list
+
+
+def benchmark_text_normalization(input_file_path, repeat_count=3):
+    with open(input_file_path, 'r', encoding='UTF-8') as input_file:
+        lines = input_file.readlines()
+    results = []
+
+    for name, parse_and_clean_line in [('before', _legacy_parse_and_clean_line), ('after', _parse_and_clean_line)]:
+        elapsed_time = min(time_call(lambda: [parse_and_clean_line(line) for line in lines])[0] for _ in range(repeat_count))
+        results.append({'normalizer': name, 'lines': len(lines), 'seconds': elapsed_time, 'lines_per_second': len(lines) / elapsed_time})
+
+    for result in results:
+        print(f"{result['normalizer']:<8} {result['lines_per_second']:>14,.0f} lines/s")
+
+    return results
+
+
+def benchmark_batch_lemmatization(lemmatized_file_path, corpus_file_path, batch_size=10000, unknown_word_modes=('passthrough', 'none', 'fuzzy')):
+    index_non_lemma = IndexNonLemma()
+    index_non_lemma.create_index(lemmatized_file_path)
+
+    with open(corpus_file_path, 'r', encoding='UTF-8') as corpus_file:
+        documents = corpus_file.read().split('\n')
+    token_count = sum(len(document.split()) for document in documents)
+    results = []
+
+    for unknown_word_mode in unknown_word_modes:
+        # a fresh cache per mode, so every run starts cold
+        index_non_lemma._reset_lemmatize_cache()
+        start_time = time.perf_counter()
+        for idx in range(0, len(documents), batch_size):
+            index_non_lemma.lemmatize_documents(documents[idx:idx + batch_size], unknown_word_mode)
+        elapsed_time = time.perf_counter() - start_time
+        results.append({'unknown_word_mode': unknown_word_mode, 'tokens': token_count, 'seconds': elapsed_time, 'tokens_per_second': token_count / elapsed_time})
+
+    for result in results:
+        print(f"{result['unknown_word_mode']:<12} {result['tokens_per_second']:>14,.0f} tokens/s")
+
+    return results
+
+
+def benchmark_levenshtein(word_pair_list, repeat_count=3):
+    results = []
+
+    for name, max_distance in [('exact', None), ('bounded', 3)]:
+        elapsed_time = min(time_call(lambda: [calc_modified_levenshtein_distance(lemma, non_lemma, max_distance) for lemma, non_lemma in word_pair_list])[0]
+                           for _ in range(repeat_count))
+        results.append({'distance': name, 'pairs': len(word_pair_list), 'seconds': elapsed_time, 'pairs_per_second': len(word_pair_list) / elapsed_time})
+
+    for result in results:
+        print(f"{result['distance']:<8} {result['pairs_per_second']:>14,.0f} pairs/s")
+
+    return results
+
+
+def benchmark_lemmatizer(input_file_path, output_file_path):
+    # the plain run gives the end-to-end time, the instrumented one the time of every stage
+    elapsed_time, _ = time_call(WikiLemmatizer().lemmatize, input_file_path, output_file_path)
+
+    lemmatizer = WikiLemmatizer()
+    lemmatizer.enable_instrumentation()
+    lemmatizer.lemmatize(input_file_path, output_file_path)
+    stats_dict = lemmatizer.get_instrumentation_report()
+
+    results = {'end_to_end_seconds': elapsed_time, 'stages': stats_dict['stages']}
+    input_line_count = stats_dict['stages']['read']['lines_out']
+    results['lines_per_second'] = input_line_count / elapsed_time
+
+    print(f"lemmatizer end to end: {elapsed_time:.2f} s, {results['lines_per_second']:,.0f} lines/s")
+    for stage, stage_dict in stats_dict['stages'].items():
+        print(f"  {stage:<10} {stage_dict['seconds']:>8.2f} s  lines in: {stage_dict['lines_in']:>10}  lines out: {stage_dict['lines_out']:>10}")
+    print(f"distance calls: {stats_dict['stages']['lemmatize']['distance_calls']}  pruned pairs: {stats_dict['stages']['lemmatize']['pruned_pairs']}")
+
+    return results
+
+
+def benchmark_indexes(lemmatized_file_path, query_count=100000, seed=0):
+    results = []
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        for index_class in [IndexLemma, IndexNonLemma]:
+            index = index_class()
+            build_time, _ = time_call(index.create_index, lemmatized_file_path)
+            index_file_path = os.path.join(index_dir, f'{index_class.__name__}.idx')
+            save_time, _ = time_call(index.save_index, index_file_path)
+            mmap_index = index_class()
+            load_time, _ = time_call(mmap_index.load_index, index_file_path)
+
+            # half of the queries hit the index, the rest are misses
+            random_generator = random.Random(seed)
+            key_list = list(index.index_dict)
+            query_list = [random_generator.choice(key_list) if (idx % 2 == 0) else f'{random_generator.choice(key_list)}xq' for idx in range(query_count)]
+
+            for backend, index_dict in [('dict', index.index_dict), ('mmap', mmap_index.index_dict)]:
+                lookup_time, _ = time_call(lambda: [index_dict.get(query) for query in query_list])
+                results.append({
+                    'index': index_class.__name__,
+                    'backend': backend,
+                    'keys': len(key_list),
+                    'build_seconds': build_time,
+                    'save_seconds': save_time,
+                    'load_seconds': load_time if (backend == 'mmap') else build_time,
+                    'lookups_per_second': query_count / lookup_time
+                })
+
+    for result in results:
+        print(f"{result['index']:<14} {result['backend']:<5} build: {result['build_seconds']:.2f} s  load: {result['load_seconds']:.4f} s  "
+              f"{result['lookups_per_second']:>12,.0f} lookups/s")
+
+    return results
+
+
+def run_benchmark_suite(output_file_path, page_count=2000, seed=0, work_dir=None, process_count_list=None):
+    if (process_count_list is None):
+        process_count_list = sorted(set([1, os.cpu_count()]))
+    corpus = SyntheticWikiCorpus(seed)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as benchmark_dir:
+        corpus_file_path = os.path.join(benchmark_dir, 'skwiki-synthetic-pages-articles.xml')
+        lemmatized_file_path = os.path.join(benchmark_dir, 'lemmatized.csv')
+        lemma_pair_file_path = os.path.join(benchmark_dir, 'lemmatized.pairs')
+        corpus.write_dump(corpus_file_path, page_count)
+
+        results = {
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'corpus': {'page_count': page_count, 'seed': seed, 'bytes': os.path.getsize(corpus_file_path)},
+            'levenshtein': benchmark_levenshtein(corpus.create_word_pairs(100000)),
+            'text_normalization': benchmark_text_normalization(corpus_file_path),
+            'lemmatizer': benchmark_lemmatizer(corpus_file_path, lemmatized_file_path),
+            'lemma_pair_conversion_seconds': time_call(write_lemma_pairs, IndexLemma()._read_lemma_pairs(lemmatized_file_path), lemma_pair_file_path)[0],
+            'multiprocess_lemmatizer': benchmark_multiprocess_lemmatizer(corpus_file_path, process_count_list),
+            'indexes': benchmark_indexes(lemmatized_file_path, seed=seed),
+            'indexes_from_lemma_pairs': benchmark_indexes(lemma_pair_file_path, seed=seed),
+            'batch_lemmatization': benchmark_batch_lemmatization(lemmatized_file_path, corpus_file_path)
+        }
+
+    with open(output_file_path, 'w', encoding='UTF-8') as output_file:
+        json.dump(results, output_file, indent=2)
+
+    return results
+
+
+def _flatten_results(results, prefix=''):
+    flat_results = {}
+
+    if (isinstance(results, dict)):
+        for key, value in results.items():
+            flat_results.update(_flatten_results(value, f'{prefix}.{key}' if (prefix) else key))
+    elif (isinstance(results, list)):
+        for idx, value in enumerate(results):
+            flat_results.update(_flatten_results(value, f'{prefix}[{idx}]'))
+    elif (isinstance(results, (int, float)) and not isinstance(results, bool)):
+        flat_results[prefix] = results
+
+    return flat_results
+
+
+def compare_results(baseline_file_path, current_file_path):
+    with open(baseline_file_path, 'r', encoding='UTF-8') as baseline_file, open(current_file_path, 'r', encoding='UTF-8') as current_file:
+        baseline_results = _flatten_results(json.load(baseline_file))
+        current_results = _flatten_results(json.load(current_file))
+    comparison = {}
+
+    # only timings and throughputs are compared, counts describe the corpus
+    for key, baseline_value in baseline_results.items():
+        if (key in current_results and baseline_value and (key.endswith('seconds') or key.endswith('per_second'))):
+            comparison[key] = {'baseline': baseline_value, 'current': current_results[key], 'ratio': current_results[key] / baseline_value}
+            print(f"{key:<70} {baseline_value:>14.4f} {current_results[key]:>14.4f} {comparison[key]['ratio']:>8.2f}x")
+
+    return comparison
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for the sk-wiki lemmatizer and indexes on a synthetic corpus')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', help='results file of an earlier run to compare against')
+    args = parser.parse_args()
+
+    run_benchmark_suite(args.output, args.pages, args.seed)
+    if (args.compare):
+        compare_results(args.compare, args.output)
@@ -0,0 +1,107 @@
+import bz2
+import random
+from xml.sax.saxutils import escape
+
+
+
+SYLLABLES = ['ko', 'še', 'mes', 'ri', 'ka', 'hra', 'dom', 'slo', 'ven', 'ná', 'ro', 'bra', 'ti', 'sla', 'va', 'ži',
+             'lin', 'tr', 'nav', 'čer', 'veň', 'ľu', 'bov', 'ďa', 'lej', 'ťah', 'ú', 'ly', 'dý', 'ch', 'ô', 'ä', 'pre']
+
+# ending of the lemma -> endings of the inflected word forms
+DECLENSIONS = [
+    ('o', ['a', 'u', 'om', 'e', 'ách', 'ami']),
+    ('a', ['y', 'e', 'u', 'ou', 'ám', 'ami']),
+    ('', ['a', 'u', 'om', 'e', 'y', 'ov', 'mi']),
+    ('ý', ['ého', 'ému', 'ým', 'om', 'í', 'ých']),
+    ('ia', ['ie', 'iu', 'iou', 'ií'])
+]
+
+ENTITIES = ['&nbsp;', '&amp;', '&quot;', '&#8211;', '&ndash;']
+FILLER_WORDS = ['a', 'v', 'na', 'sa', 'je', 'bol', 'ktorý', 'ako', 'aj', 'pri', 'od', 'po', '1918', '–', '(', ')', ',', '.']
+
+
+
+class SyntheticWikiCorpus:
+
+    def __init__(self, seed=0, vocabulary_size=2000):
+        self.random = random.Random(seed)
+        self.lemma_list = [self._create_lemma() for _ in range(vocabulary_size)]
+
+
+    def _create_lemma(self):
+        stem = ''.join(self.random.choice(SYLLABLES) for _ in range(self.random.randint(1, 3)))
+        lemma_ending, word_form_endings = self.random.choice(DECLENSIONS)
+
+        return (stem + lemma_ending, [stem + ending for ending in word_form_endings])
+
+
+    def _create_link(self):
+        link_word_count = self.random.choice([1, 1, 1, 2, 2, 3, 4])
+        lemma_words = [self.random.choice(self.lemma_list) for _ in range(link_word_count)]
+        link = ' '.join(lemma for lemma, _ in lemma_words)
+        if (self.random.random() < 0.3):
+            link = link[0].upper() + link[1:]
+        link_kind = self.random.random()
+
+        if (link_kind < 0.1):
+            # disambiguation text in the link
+            anchor_text = ' '.join(self.random.choice(word_forms) for _, word_forms in lemma_words)
+            return f'[[{link} ({self.random.choice(["obec", "rieka", "1918 – 1919", "film"])})|{anchor_text}]]'
+        elif (link_kind < 0.6):
+            anchor_word_list = [self.random.choice(word_forms) for _, word_forms in lemma_words]
+            if (self.random.random() < 0.2):
+                anchor_word_list.insert(self.random.randint(0, len(anchor_word_list)), self.random.choice(ENTITIES))
+            if (self.random.random() < 0.1):
+                anchor_word_list.append(self.random.choice(FILLER_WORDS))
+            return f'[[{link}|{" ".join(anchor_word_list)}]]'
+        elif (link_kind < 0.8):
+            return f'[[{link}]]{self.random.choice(["y", "u", "om", "ou", "ami", "och"])}'
+        return f'[[{link}]]'
+
+
+    def _create_line(self, max_link_count):
+        word_list = []
+
+        for _ in range(self.random.randint(0, max_link_count)):
+            word_list.extend(self.random.choice(FILLER_WORDS) for _ in range(self.random.randint(0, 8)))
+            word_list.append(self._create_link())
+        word_list.extend(self.random.choice(FILLER_WORDS) for _ in range(self.random.randint(0, 8)))
+
+        return ' '.join(word_list)
+
+
+    def create_page_text(self, line_count=10, max_link_count=5):
+        return '\n'.join(self._create_line(max_link_count) for _ in range(self.random.randint(1, line_count)))
+
+
+    def write_dump(self, output_file_path, page_count, line_count=10, max_link_count=5):
+        # same layout as the skwiki pages-articles dump, plain or bz2 compressed depending on the file name
+        opener = bz2.open if (output_file_path.endswith('.bz2')) else open
+
+        with opener(output_file_path, 'wt', encoding='UTF-8') as output_file:
+            output_file.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" xml:lang="sk">\n')
+            for page_id in range(1, page_count + 1):
+                text = escape(self.create_page_text(line_count, max_link_count), {'"': '&quot;'})
+                output_file.write('  <page>\n')
+                output_file.write(f'    <title>Stránka {page_id}</title>\n')
+                output_file.write('    <ns>0</ns>\n')
+                output_file.write(f'    <id>{page_id}</id>\n')
+                output_file.write('    <revision>\n')
+                output_file.write(f'      <id>{page_id}</id>\n')
+                output_file.write(f'      <text bytes="{len(text.encode("UTF-8"))}" xml:space="preserve">{text}</text>\n')
+                output_file.write('    </revision>\n')
+                output_file.write('  </page>\n')
+            output_file.write('</mediawiki>\n')
+
+
+    def create_word_pairs(self, pair_count):
+        word_pair_list = []
+
+        for _ in range(pair_count):
+            lemma, word_forms = self.random.choice(self.lemma_list)
+            if (self.random.random() < 0.5):
+                word_pair_list.append((lemma, self.random.choice(word_forms)))
+            else:
+                word_pair_list.append((lemma, self.random.choice(self.random.choice(self.lemma_list)[1])))
+
+        return word_pair_list
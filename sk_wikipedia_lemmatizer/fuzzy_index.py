@@ -0,0 +1,76 @@
+from levenshtein import calc_modified_levenshtein_distance, MAX_LENGTH_DIFFERENCE
+from index_storage import INDEX_KIND_FUZZY, MmapIndexDict, write_index, read_index_kind
+
+
+
+def get_fuzzy_index_file_path(index_file_path):
+    return index_file_path + '.fuzzy'
+
+
+def _get_blocks(length):
+    # at most a quarter of the lemma positions may differ from the word form, so splitting
+    # the lemma into length // 4 + 1 blocks leaves at least one block that matches in place
+    block_count = length // 4 + 1
+    boundaries = [length * idx // block_count for idx in range(block_count + 1)]
+
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def _get_block_key(length, start, block):
+    return f'{length}|{start}|{block}'
+
+
+
+class FuzzyLemmaIndex:
+
+    def __init__(self):
+        self.block_dict = {}
+
+
+    def create_index(self, lemmas):
+        self.block_dict = {}
+
+        for lemma in lemmas:
+            if (not lemma):
+                continue
+
+            for start, end in _get_blocks(len(lemma)):
+                block_key = _get_block_key(len(lemma), start, lemma[start:end])
+                if (block_key not in self.block_dict):
+                    self.block_dict[block_key] = set()
+                self.block_dict[block_key].add(lemma)
+
+
+    def save_index(self, output_file_path):
+        write_index(self.block_dict, INDEX_KIND_FUZZY, output_file_path)
+
+
+    def load_index(self, index_file_path):
+        if (read_index_kind(index_file_path) != INDEX_KIND_FUZZY):
+            raise ValueError(f'{index_file_path} does not contain a fuzzy lemma index')
+        self.block_dict = MmapIndexDict(index_file_path)
+
+
+    def _get_candidate_lemmas(self, word):
+        candidate_lemma_set = set()
+
+        # a lemma can be up to MAX_LENGTH_DIFFERENCE characters shorter than the word form
+        for length in range(max(1, len(word) - MAX_LENGTH_DIFFERENCE), len(word) + 1):
+            for start, end in _get_blocks(length):
+                candidate_lemma_set.update(self.block_dict.get(_get_block_key(length, start, word[start:end]), ()))
+
+        return candidate_lemma_set
+
+
+    def lookup(self, word, max_distance=3, max_candidates=1):
+        candidate_list = []
+
+        for lemma in self._get_candidate_lemmas(word):
+            levenshtein_distance = calc_modified_levenshtein_distance(lemma, word, max_distance)
+            if (levenshtein_distance >= 0 and levenshtein_distance <= max_distance):
+                candidate_list.append((levenshtein_distance, -len(lemma), lemma))
+
+        # closest lemma first, longer lemmas win ties because they share more of the word
+        candidate_list.sort()
+
+        return [(lemma, levenshtein_distance) for levenshtein_distance, _, lemma in candidate_list[:max_candidates]]
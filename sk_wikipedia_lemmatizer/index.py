@@ -1,10 +1,33 @@
+import os
+import json
+import datetime
+import functools
+import itertools
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from pair_counter import PairCounter
+from sketches import CountMinSketch, HyperLogLog, hash_strings
+from lemma_pair_storage import NO_STRING_ID, calc_file_hash, is_lemma_pair_file, iter_lemma_pairs, read_lemma_pair_arrays
+from fuzzy_index import FuzzyLemmaIndex, get_fuzzy_index_file_path
+from index_storage import INDEX_KIND_LEMMA, INDEX_KIND_NON_LEMMA, MmapIndexDict, write_index, read_index_kind
+
+
+
+def get_alternative_file_path(index_file_path):
+    return index_file_path + '.alt'
 
 
 
 class BaseIndex:
 
+    statistics_chunk_size = 250000
+    # sketch sizes of the approximate statistics
+    count_min_width = 2 ** 18
+    count_min_depth = 4
+    hyper_log_log_precision = 14
+    top_candidate_count = 1000
+
+
     def _get_link_and_anchor_text(self, line, separator):
         line_list = line.split(separator)
         link = line_list[0]
@@ -18,7 +41,67 @@ class BaseIndex:
         return (link, anchor_text)
 
 
+    def _read_lemma_pairs(self, input_file_path):
+        if (is_lemma_pair_file(input_file_path)):
+            for lemma_pair in iter_lemma_pairs(input_file_path):
+                yield lemma_pair
+            return
+
+        with open(input_file_path, 'r', encoding='UTF-8') as input_file:
+            for line in input_file:
+                # counted output of the Spark lemmatizer has count<TAB>lemma<TAB>non-lemma lines
+                if ('\t' in line):
+                    count, lemma, non_lemma = line.rstrip('\n').split('\t')
+                    yield (lemma, non_lemma or None, int(count))
+                    continue
+
+                lemma, non_lemma = self._get_link_and_anchor_text(line, '|')
+                lemma = lemma.strip('\n')
+                
+                if (non_lemma):
+                    non_lemma = non_lemma.strip('\n')
+                    
+                yield (lemma, non_lemma, 1)
+
+
+    def _group_lemma_pairs(self, string_list, lemma_ids, non_lemma_ids, counts, key='lemma'):
+        # sorts the pairs with a non-lemma into groups of equal lemma or non-lemma ids,
+        # returns the sorted lemma, non-lemma and count arrays and the group boundaries
+        counts = counts.astype(np.int64)
+        has_non_lemma = (non_lemma_ids != NO_STRING_ID)
+        lemma_ids, non_lemma_ids, counts = lemma_ids[has_non_lemma], non_lemma_ids[has_non_lemma], counts[has_non_lemma]
+
+        if (key == 'lemma'):
+            order = np.argsort(lemma_ids, kind='stable')
+            key_ids = lemma_ids[order]
+        else:
+            # within a non-lemma the most frequent lemma comes first, ties are ordered alphabetically
+            string_ranks = np.empty(len(string_list), dtype=np.int64)
+            string_ranks[sorted(range(len(string_list)), key=string_list.__getitem__)] = np.arange(len(string_list))
+            order = np.lexsort((string_ranks[lemma_ids], -counts, non_lemma_ids))
+            key_ids = non_lemma_ids[order]
+
+        group_starts = np.flatnonzero(np.r_[True, key_ids[1:] != key_ids[:-1]]) if (len(key_ids) > 0) else np.empty(0, dtype=np.int64)
+        group_ends = np.r_[group_starts[1:], len(key_ids)].astype(np.int64)
+
+        return (lemma_ids[order], non_lemma_ids[order], counts[order], group_starts, group_ends)
+
+
+    def save_index(self, output_file_path):
+        write_index(self.index_dict, self.index_kind, output_file_path)
+
+
+    def load_index(self, index_file_path):
+        if (read_index_kind(index_file_path) != self.index_kind):
+            raise ValueError(f'{index_file_path} does not contain a {type(self).__name__} index')
+        # lookups run directly on the memory-mapped file, processes share its page cache
+        self.index_dict = MmapIndexDict(index_file_path)
+
+
     def _plot_most_common_lemmas(self, lemmas, counts):
+        # imported here, so the statistics also run where matplotlib is not installed
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(figsize=(12, 5))
         plt.xlabel('Lemma')
         plt.ylabel('Count') 
@@ -26,64 +109,207 @@ class BaseIndex:
         plt.show()
 
 
-    def calc_overall_statistics(self, input_file_path):
-        stats_dict = {
-            'unique_lemma_dict': {},
-            'unique_non_lemma_dict': {},
-            'unique_lemma_count': 0,
-            'unique_non_lemma_count': 0,
-            'unique_word_count': 0
-        }
-        
+    def _parse_lemma_pair_lines(self, line_list, first_row):
+        # equal lines are grouped first, so only the distinct lines of the chunk are parsed,
+        # row is the line number of the first occurrence in the file
+        line_ids, unique_lines = pd.factorize(np.array(line_list, dtype=object))
+        line_counts = np.bincount(line_ids)
+        first_rows = first_row + np.unique(line_ids, return_index=True)[1]
+
+        lemma_list = []
+        non_lemma_list = []
+        count_list = []
+        invalid_row_count = 0
+        for line, line_count in zip(unique_lines, line_counts.tolist()):
+            line = line.rstrip('\n')
+            # counted output of the Spark lemmatizer has count<TAB>lemma<TAB>non-lemma lines
+            if ('\t' in line):
+                count, lemma, non_lemma = line.split('\t')
+                line_count *= int(count)
+            else:
+                line_parts = line.split('|')
+                lemma = line_parts[0]
+                non_lemma = line_parts[1] if (len(line_parts) == 2) else None
+                if (len(line_parts) > 2):
+                    invalid_row_count += line_count
+
+            lemma_list.append(lemma)
+            non_lemma_list.append(non_lemma)
+            count_list.append(line_count)
+
+        if (invalid_row_count > 0):
+            print(f'get_link_and_anchor_text() {invalid_row_count} invalid rows')
+
+        return pd.DataFrame({
+            'lemma': pd.Series(lemma_list, dtype=object),
+            'non_lemma': pd.Series(non_lemma_list, dtype=object),
+            'count': np.array(count_list, dtype=np.int64),
+            'row': first_rows.astype(np.int64)
+        })
+
+
+    def _iter_lemma_pair_frames(self, input_file_path, chunk_size):
+        if (is_lemma_pair_file(input_file_path)):
+            string_list, lemma_ids, non_lemma_ids, counts = read_lemma_pair_arrays(input_file_path)
+            # the extra last string stands for the missing non-lemma
+            string_array = np.array(string_list + [None], dtype=object)
+            non_lemma_ids = np.where(non_lemma_ids == NO_STRING_ID, len(string_list), non_lemma_ids)
+
+            for start in range(0, len(lemma_ids), chunk_size):
+                end = start + chunk_size
+                yield pd.DataFrame({
+                    'lemma': string_array[lemma_ids[start:end]],
+                    'non_lemma': string_array[non_lemma_ids[start:end]],
+                    'count': counts[start:end].astype(np.int64),
+                    'row': np.arange(start, min(end, len(lemma_ids)), dtype=np.int64)
+                })
+            return
+
         with open(input_file_path, 'r', encoding='UTF-8') as input_file:
-            for line in input_file:
-                lemma, non_lemma = self._get_link_and_anchor_text(line, '|')
-                lemma = lemma.strip('\n')
+            first_row = 0
+            while (True):
+                line_list = list(itertools.islice(input_file, chunk_size))
+                if (not line_list):
+                    break
+                yield self._parse_lemma_pair_lines(line_list, first_row)
+                first_row += len(line_list)
 
-                if (lemma not in stats_dict['unique_lemma_dict'] and lemma not in stats_dict['unique_non_lemma_dict']):
-                    stats_dict['unique_lemma_dict'][lemma] = 1
-                    stats_dict['unique_word_count'] += 1
-                    stats_dict['unique_lemma_count'] += 1
-                elif (lemma in stats_dict['unique_lemma_dict']):
-                    stats_dict['unique_lemma_dict'][lemma] += 1
 
-                if (non_lemma):
-                    non_lemma = non_lemma.strip('\n')
-                    if (non_lemma not in stats_dict['unique_non_lemma_dict']):
-                        stats_dict['unique_non_lemma_dict'][non_lemma] = 1
-                        stats_dict['unique_word_count'] += 1
-                        stats_dict['unique_non_lemma_count'] += 1
-                    else:
-                        stats_dict['unique_non_lemma_dict'][non_lemma] += 1
-                    
+    def _aggregate_words(self, frame, column):
+        # count and first row of every word of the column
+        return frame.groupby(column, sort=False).agg(count=('count', 'sum'), first_row=('row', 'min'))
+
+
+    def _merge_word_aggregates(self, aggregate_list):
+        if (len(aggregate_list) == 1):
+            return aggregate_list[0]
+        return pd.concat(aggregate_list).groupby(level=0, sort=False).agg({'count': 'sum', 'first_row': 'min'})
+
+
+    def _calc_exact_statistics(self, input_file_path, top_k):
+        lemma_aggregate_list = []
+        non_lemma_aggregate_list = []
+        buffered_row_count = 0
+        merged_row_count = 0
+
+        for frame in self._iter_lemma_pair_frames(input_file_path, self.statistics_chunk_size):
+            lemma_aggregate_list.append(self._aggregate_words(frame, 'lemma'))
+            non_lemma_aggregate_list.append(self._aggregate_words(frame[frame['non_lemma'].notna() & (frame['non_lemma'] != '')], 'non_lemma'))
+            buffered_row_count += len(lemma_aggregate_list[-1]) + len(non_lemma_aggregate_list[-1])
+
+            # chunk results are merged once they outgrow the last merge, memory follows the number of distinct words
+            if (buffered_row_count > max(4 * self.statistics_chunk_size, 2 * merged_row_count)):
+                lemma_aggregate_list = [self._merge_word_aggregates(lemma_aggregate_list)]
+                non_lemma_aggregate_list = [self._merge_word_aggregates(non_lemma_aggregate_list)]
+                merged_row_count = buffered_row_count = len(lemma_aggregate_list[0]) + len(non_lemma_aggregate_list[0])
+
+        empty_aggregate = pd.DataFrame({'count': pd.Series(dtype=np.int64), 'first_row': pd.Series(dtype=np.int64)})
+        lemma_aggregate = self._merge_word_aggregates(lemma_aggregate_list or [empty_aggregate])
+        non_lemma_aggregate = self._merge_word_aggregates(non_lemma_aggregate_list or [empty_aggregate])
+
+        # a word counts as a lemma unless it was seen as a non-lemma first, in a line the lemma comes before the non-lemma
+        non_lemma_first_rows = non_lemma_aggregate['first_row'].reindex(lemma_aggregate.index).fillna(np.inf)
+        lemma_counts = lemma_aggregate.loc[lemma_aggregate['first_row'] <= non_lemma_first_rows, 'count']
+
+        return {
+            'unique_word_count': len(lemma_counts) + len(non_lemma_aggregate),
+            'unique_lemma_count': len(lemma_counts),
+            'unique_non_lemma_count': len(non_lemma_aggregate),
+            'top_lemmas': list(lemma_counts.nlargest(top_k).items())
+        }
+
+
+    def _calc_approximate_statistics(self, input_file_path, top_k):
+        # memory stays fixed: the sketches have a fixed size and only top_candidate_count lemmas are kept,
+        # words that were seen as a non-lemma first are not excluded from the lemmas
+        lemma_sketch = HyperLogLog(self.hyper_log_log_precision)
+        non_lemma_sketch = HyperLogLog(self.hyper_log_log_precision)
+        lemma_count_sketch = CountMinSketch(self.count_min_width, self.count_min_depth)
+        top_candidate_count = max(top_k, self.top_candidate_count)
+        top_candidates = pd.Series(dtype=np.int64)
+
+        for frame in self._iter_lemma_pair_frames(input_file_path, self.statistics_chunk_size):
+            lemma_counts = frame.groupby('lemma', sort=False)['count'].sum()
+            lemma_hashes = hash_strings(lemma_counts.index)
+            lemma_sketch.add(lemma_hashes)
+            lemma_count_sketch.add(lemma_hashes, lemma_counts.to_numpy())
+
+            non_lemmas = frame['non_lemma']
+            non_lemma_sketch.add(hash_strings(non_lemmas[non_lemmas.notna() & (non_lemmas != '')].unique()))
+
+            # estimates only grow, so the latest estimate of a candidate is the largest one
+            estimates = pd.Series(lemma_count_sketch.estimate(lemma_hashes), index=lemma_counts.index)
+            top_candidates = pd.concat([top_candidates, estimates]).groupby(level=0, sort=False).max().nlargest(top_candidate_count)
+
+        lemma_count = lemma_sketch.count()
+        non_lemma_count = non_lemma_sketch.count()
+
+        return {
+            'unique_word_count': lemma_count + non_lemma_count,
+            'unique_lemma_count': lemma_count,
+            'unique_non_lemma_count': non_lemma_count,
+            'top_lemmas': list(top_candidates.nlargest(top_k).items())
+        }
+
+
+    def calc_overall_statistics(self, input_file_path, top_k=10, plot=True, approximate=False):
+        if (approximate):
+            stats_dict = self._calc_approximate_statistics(input_file_path, top_k)
+        else:
+            stats_dict = self._calc_exact_statistics(input_file_path, top_k)
+        stats_dict['top_lemmas'] = [(lemma, int(count)) for lemma, count in stats_dict['top_lemmas']]
+        stats_dict['approximate'] = approximate
+
         print(f"Number of unique words: {stats_dict['unique_word_count']}")
         print(f"Number of unique lemmas: {stats_dict['unique_lemma_count']}")
         print(f"Number of unique non-lemmas: {stats_dict['unique_non_lemma_count']}")
 
-        stats_df = pd.DataFrame(stats_dict['unique_lemma_dict'].items(), columns=['lemma', 'count'])
-        top_10_lemma_df = stats_df.sort_values(by='count', ascending=False)[['lemma', 'count']].head(10)
-        self._plot_most_common_lemmas(top_10_lemma_df['lemma'], top_10_lemma_df['count'])
+        if (plot):
+            self._plot_most_common_lemmas([lemma for lemma, _ in stats_dict['top_lemmas']], [count for _, count in stats_dict['top_lemmas']])
+
+        return stats_dict
 
 
 
 class IndexLemma(BaseIndex):
 
+    index_kind = INDEX_KIND_LEMMA
+
+
     def __init__(self):
         self.index_dict = {}
     
     
+    def create_fuzzy_index(self):
+        fuzzy_index = FuzzyLemmaIndex()
+        fuzzy_index.create_index(self.index_dict)
+
+        return fuzzy_index
+    
+    
+    def _create_index_from_lemma_pair_file(self, input_file_path):
+        string_list, lemma_ids, non_lemma_ids, counts = read_lemma_pair_arrays(input_file_path)
+
+        # lemma-only records still create an (empty) entry
+        for lemma_id in pd.unique(lemma_ids).tolist():
+            self.index_dict.setdefault(string_list[lemma_id], set())
+
+        lemma_ids, non_lemma_ids, _, group_starts, group_ends = self._group_lemma_pairs(string_list, lemma_ids, non_lemma_ids, counts, 'lemma')
+        for lemma_id, start, end in zip(lemma_ids[group_starts].tolist(), group_starts.tolist(), group_ends.tolist()):
+            self.index_dict[string_list[lemma_id]].update(map(string_list.__getitem__, non_lemma_ids[start:end].tolist()))
+
+
     def create_index(self, input_file_path):
-        with open(input_file_path, 'r', encoding='UTF-8') as input_file:
-            for line in input_file:
-                lemma, non_lemma = self._get_link_and_anchor_text(line, '|')
-                lemma = lemma.strip('\n')
-                
-                if (lemma not in self.index_dict):
-                    self.index_dict[lemma] = set()
-                
-                if (non_lemma):
-                    non_lemma = non_lemma.strip('\n')
-                    self.index_dict[lemma].add(non_lemma)
+        if (is_lemma_pair_file(input_file_path)):
+            self._create_index_from_lemma_pair_file(input_file_path)
+            return
+
+        for lemma, non_lemma, _ in self._read_lemma_pairs(input_file_path):
+            if (lemma not in self.index_dict):
+                self.index_dict[lemma] = set()
+            
+            if (non_lemma):
+                self.index_dict[lemma].add(non_lemma)
     
     
     def lookup_query(self, query):
@@ -98,20 +324,173 @@ class IndexLemma(BaseIndex):
 
 class IndexNonLemma(BaseIndex):
 
-    def __init__(self):
+    index_kind = INDEX_KIND_NON_LEMMA
+    unknown_word_modes = ('passthrough', 'none', 'fuzzy')
+    lemmatize_cache_size = 1024 * 1024
+    max_pairs_in_memory = 5 * 1000 * 1000
+
+
+    def __init__(self, fuzzy_index=None, top_k=None):
         self.index_dict = {}
+        # up to top_k (lemma, score) alternatives for every non-lemma, kept only when top_k is set
+        self.alternative_dict = {}
+        self.top_k = top_k
+        # built with IndexLemma.create_fuzzy_index(), otherwise created from this index on first use
+        self.fuzzy_index = fuzzy_index
+        # a fuzzy index passed in is kept by create_index(), one created from the index values is not
+        self.keep_fuzzy_index = fuzzy_index is not None
+        self._reset_lemmatize_cache()
+
+
+    def _reset_lemmatize_cache(self):
+        self._lemmatize_token_cached = functools.lru_cache(maxsize=self.lemmatize_cache_size)(self._lemmatize_token)
+
+
+    def _lookup_fuzzy(self, token):
+        if (self.fuzzy_index is None):
+            self.fuzzy_index = FuzzyLemmaIndex()
+            self.fuzzy_index.create_index(set(self.index_dict.values()))
+
+        candidate_list = self.fuzzy_index.lookup(token)
+        if (candidate_list):
+            return candidate_list[0][0]
+        return None
+
+
+    def _lemmatize_token(self, token, unknown_word_mode):
+        lemma = self.index_dict.get(token)
+        
+        if (lemma is not None):
+            return lemma
+        elif (unknown_word_mode == 'passthrough'):
+            return token
+        elif (unknown_word_mode == 'fuzzy'):
+            return self._lookup_fuzzy(token)
+        return None
+
+
+    def lemmatize_tokens(self, tokens, unknown_word_mode='passthrough'):
+        if (unknown_word_mode not in self.unknown_word_modes):
+            raise ValueError(f'unknown_word_mode must be one of {self.unknown_word_modes}')
+
+        token_list = [token.lower() for token in tokens]
+        # look up every distinct token once, the rest of the batch reuses the result
+        lemma_dict = {token: self._lemmatize_token_cached(token, unknown_word_mode) for token in dict.fromkeys(token_list)}
+        
+        return [lemma_dict[token] for token in token_list]
+
+
+    def lemmatize_documents(self, documents, unknown_word_mode='passthrough'):
+        token_lists = [document.split() for document in documents]
+        lemma_list = self.lemmatize_tokens(itertools.chain.from_iterable(token_lists), unknown_word_mode)
+        
+        lemma_lists = []
+        offset = 0
+        for token_list in token_lists:
+            lemma_lists.append(lemma_list[offset:offset + len(token_list)])
+            offset += len(token_list)
+            
+        return lemma_lists
+
+
+    def save_index(self, output_file_path):
+        super().save_index(output_file_path)
+        
+        if (self.fuzzy_index is not None):
+            self.fuzzy_index.save_index(get_fuzzy_index_file_path(output_file_path))
+        self._save_alternatives(get_alternative_file_path(output_file_path))
+
+
+    def _save_alternatives(self, output_file_path):
+        # non-lemma<TAB>lemma<TAB>score lines, the alternatives of a non-lemma in score order
+        if (not self.alternative_dict):
+            if (os.path.exists(output_file_path)):
+                os.remove(output_file_path)
+            return
+
+        temp_file_path = output_file_path + '.tmp'
+        with open(temp_file_path, 'w', encoding='UTF-8') as output_file:
+            for non_lemma, alternative_list in self.alternative_dict.items():
+                output_file.writelines(f'{non_lemma}\t{lemma}\t{score!r}\n' for lemma, score in alternative_list)
+        os.replace(temp_file_path, output_file_path)
+
+
+    def _load_alternatives(self, input_file_path):
+        self.alternative_dict = {}
+        if (not os.path.exists(input_file_path)):
+            return
+
+        with open(input_file_path, 'r', encoding='UTF-8') as input_file:
+            for line in input_file:
+                non_lemma, lemma, score = line.rstrip('\n').split('\t')
+                self.alternative_dict.setdefault(non_lemma, []).append((lemma, float(score)))
+
+
+    def load_index(self, index_file_path):
+        super().load_index(index_file_path)
+        self._reset_lemmatize_cache()
+        self.fuzzy_index = None
+        self.keep_fuzzy_index = False
+
+        # the fuzzy index is stored next to the main index, so it is not rebuilt on start
+        fuzzy_index_file_path = get_fuzzy_index_file_path(index_file_path)
+        if (os.path.exists(fuzzy_index_file_path)):
+            self.fuzzy_index = FuzzyLemmaIndex()
+            self.fuzzy_index.load_index(fuzzy_index_file_path)
+        self._load_alternatives(get_alternative_file_path(index_file_path))
     
     
+    def _set_lemma_counts(self, non_lemma, lemma_count_dict):
+        # the most frequent lemma wins, ties go to the alphabetically first one,
+        # so the index does not depend on the order of the lemmatizer output
+        lemma_count_list = sorted(lemma_count_dict.items(), key=lambda lemma_count: (-lemma_count[1], lemma_count[0]))
+        self.index_dict[non_lemma] = lemma_count_list[0][0]
+        
+        if (self.top_k):
+            total_count = sum(lemma_count_dict.values())
+            self.alternative_dict[non_lemma] = [(lemma, count / total_count) for lemma, count in lemma_count_list[:self.top_k]]
+
+
+    def _create_index_from_lemma_pair_file(self, input_file_path):
+        string_list, lemma_ids, non_lemma_ids, counts = read_lemma_pair_arrays(input_file_path)
+        lemma_ids, non_lemma_ids, counts, group_starts, group_ends = self._group_lemma_pairs(string_list, lemma_ids, non_lemma_ids, counts, 'non_lemma')
+
+        # the first pair of every group is the one _set_lemma_counts would pick
+        self.index_dict.update(zip(map(string_list.__getitem__, non_lemma_ids[group_starts].tolist()), 
+                                   map(string_list.__getitem__, lemma_ids[group_starts].tolist())))
+
+        if (self.top_k and len(group_starts) > 0):
+            total_counts = np.add.reduceat(counts, group_starts)
+            for non_lemma_id, start, end, total_count in zip(non_lemma_ids[group_starts].tolist(), group_starts.tolist(), group_ends.tolist(), total_counts.tolist()):
+                end = min(end, start + self.top_k)
+                self.alternative_dict[string_list[non_lemma_id]] = [(string_list[lemma_id], count / total_count) 
+                                                                    for lemma_id, count in zip(lemma_ids[start:end].tolist(), counts[start:end].tolist())]
+
+
     def create_index(self, input_file_path):
-        with open(input_file_path, 'r', encoding='UTF-8') as input_file:
-            for line in input_file:
-                lemma, non_lemma = self._get_link_and_anchor_text(line, '|')
-                lemma = lemma.strip('\n')
-                
+        self._reset_lemmatize_cache()
+        if (not self.keep_fuzzy_index):
+            self.fuzzy_index = None
+
+        if (is_lemma_pair_file(input_file_path)):
+            self._create_index_from_lemma_pair_file(input_file_path)
+            return
+
+        pair_counter = PairCounter(self.max_pairs_in_memory)
+
+        try:
+            for lemma, non_lemma, count in self._read_lemma_pairs(input_file_path):
                 if (non_lemma):
-                    non_lemma = non_lemma.strip('\n')
-                    if (non_lemma not in self.index_dict):
-                        self.index_dict[non_lemma] = lemma
+                    pair_counter.add(non_lemma, lemma, count)
+                    
+            for non_lemma, lemma_count_dict in pair_counter.iter_grouped_counts():
+                self._set_lemma_counts(non_lemma, lemma_count_dict)
+        finally:
+            pair_counter.close()
+
+
+    def lookup_alternatives(self, non_lemma):
+        return self.alternative_dict.get(non_lemma.lower(), [])
     
     
     def lookup_query(self, query):
@@ -121,3 +500,223 @@ class IndexNonLemma(BaseIndex):
         for term in term_list:
             if term in self.index_dict:
                 print(f'Non-lemma: {term}, lemma: {self.index_dict[term]}')
+
+
+
+def load_index(index_file_path):
+    index_class = IndexLemma if (read_index_kind(index_file_path) == INDEX_KIND_LEMMA) else IndexNonLemma
+    index = index_class()
+    index.load_index(index_file_path)
+    
+    return index
+
+
+
+class IncrementalIndex(BaseIndex):
+
+    manifest_file_name = 'manifest.json'
+    # manifest key -> file name of manifests of older versions, every save writes the files under new versioned names
+    versioned_file_names = {
+        'pair_count_file': 'pair_counts.tsv', 
+        'index_lemma_file': 'index_lemma.idx', 
+        'index_non_lemma_file': 'index_non_lemma.idx'
+    }
+
+
+    def __init__(self, index_dir, top_k=None):
+        self.index_dir = index_dir
+        # number of lemma alternatives kept for every non-lemma in the saved IndexNonLemma
+        self.top_k = top_k
+        # (lemma, non-lemma) -> number of lemmatizer output lines, lemma-only lines use an empty non-lemma
+        self.pair_count_dict = {}
+        # the manifest of the saved version, the files it names are the current index
+        self.manifest_dict = {'applied_dumps': {}}
+
+        if (os.path.exists(self._get_file_path(self.manifest_file_name))):
+            self._load()
+
+
+    def save_index(self, output_file_path):
+        raise NotImplementedError('IncrementalIndex is saved to its index_dir by save(), save the index of get_index_lemma() or get_index_non_lemma() instead')
+
+
+    def load_index(self, index_file_path):
+        raise NotImplementedError('IncrementalIndex is loaded from its index_dir, use load_index_lemma() or load_index_non_lemma() instead')
+
+
+    def _get_file_path(self, file_name):
+        return os.path.join(self.index_dir, file_name)
+
+
+    def _get_file_name(self, manifest_dict, key):
+        # manifests of older versions do not name the files
+        return manifest_dict.get(key, self.versioned_file_names[key])
+
+
+    def _get_version(self, manifest_dict):
+        return manifest_dict.get('version', manifest_dict.get('pair_count_version', 0))
+
+
+    def _load(self):
+        with open(self._get_file_path(self.manifest_file_name), 'r', encoding='UTF-8') as manifest_file:
+            self.manifest_dict = json.load(manifest_file)
+
+        self.pair_count_dict = {}
+        with open(self._get_file_path(self._get_file_name(self.manifest_dict, 'pair_count_file')), 'r', encoding='UTF-8') as pair_count_file:
+            for line in pair_count_file:
+                count, lemma, non_lemma = line.rstrip('\n').split('\t')
+                self.pair_count_dict[(lemma, non_lemma)] = int(count)
+
+
+    def _write_atomically(self, file_name, write_function):
+        file_path = self._get_file_path(file_name)
+        temp_file_path = file_path + '.tmp'
+        
+        with open(temp_file_path, 'w', encoding='UTF-8') as output_file:
+            write_function(output_file)
+            output_file.flush()
+            os.fsync(output_file.fileno())
+        os.replace(temp_file_path, file_path)
+
+
+    def _update_pair_counts(self, pair_count_dict, input_file_path, increment):
+        for lemma, non_lemma, count in self._read_lemma_pairs(input_file_path):
+            pair = (lemma, non_lemma or '')
+            count = pair_count_dict.get(pair, 0) + increment * count
+            
+            if (count > 0):
+                pair_count_dict[pair] = count
+            elif (pair in pair_count_dict):
+                del pair_count_dict[pair]
+            elif (count < 0):
+                print(f'Removing pair {pair} that is not in the index')
+
+
+    def _create_index_lemma(self, pair_count_dict):
+        index_lemma = IndexLemma()
+        
+        for lemma, non_lemma in pair_count_dict:
+            if (lemma not in index_lemma.index_dict):
+                index_lemma.index_dict[lemma] = set()
+            if (non_lemma):
+                index_lemma.index_dict[lemma].add(non_lemma)
+                
+        return index_lemma
+
+
+    def _create_index_non_lemma(self, pair_count_dict, top_k):
+        index_non_lemma = IndexNonLemma(top_k=top_k)
+        lemma_count_dicts = {}
+        
+        for (lemma, non_lemma), count in pair_count_dict.items():
+            if (non_lemma):
+                if (non_lemma not in lemma_count_dicts):
+                    lemma_count_dicts[non_lemma] = {}
+                lemma_count_dicts[non_lemma][lemma] = count
+
+        for non_lemma, lemma_count_dict in lemma_count_dicts.items():
+            index_non_lemma._set_lemma_counts(non_lemma, lemma_count_dict)
+                
+        return index_non_lemma
+
+
+    def get_index_lemma(self):
+        return self._create_index_lemma(self.pair_count_dict)
+
+
+    def get_index_non_lemma(self, top_k=None):
+        return self._create_index_non_lemma(self.pair_count_dict, top_k)
+
+
+    def _remove_files(self, manifest_dict, new_manifest_dict):
+        index_non_lemma_file_path = self._get_file_path(self._get_file_name(manifest_dict, 'index_non_lemma_file'))
+        file_path_list = [self._get_file_path(self._get_file_name(manifest_dict, key)) for key in self.versioned_file_names]
+        file_path_list.extend([get_fuzzy_index_file_path(index_non_lemma_file_path), get_alternative_file_path(index_non_lemma_file_path)])
+        new_file_names = set(new_manifest_dict[key] for key in self.versioned_file_names)
+
+        for file_path in file_path_list:
+            if (os.path.basename(file_path) not in new_file_names and os.path.exists(file_path)):
+                os.remove(file_path)
+
+
+    def _commit(self, pair_count_dict, manifest_dict):
+        # every file of a version gets a new name and only the manifest names the current ones, so replacing
+        # the manifest commits the indexes, the counts and the applied dumps together, after a crash before it
+        # the files and the manifest of the previous version are still in place and the dump is applied to them again
+        os.makedirs(self.index_dir, exist_ok=True)
+        has_saved_version = os.path.exists(self._get_file_path(self.manifest_file_name))
+
+        # the version continues from the saved manifest, also when create_index() starts a new one
+        version = self._get_version(self.manifest_dict) + 1
+        new_manifest_dict = {key: value for key, value in manifest_dict.items() if (key != 'pair_count_version')}
+        new_manifest_dict['version'] = version
+        for key, file_name in self.versioned_file_names.items():
+            root, extension = os.path.splitext(file_name)
+            new_manifest_dict[key] = f'{root}.{version}{extension}'
+
+        index_lemma = self._create_index_lemma(pair_count_dict)
+        index_lemma.save_index(self._get_file_path(new_manifest_dict['index_lemma_file']))
+        index_non_lemma = self._create_index_non_lemma(pair_count_dict, self.top_k)
+        index_non_lemma.fuzzy_index = index_lemma.create_fuzzy_index()
+        index_non_lemma.save_index(self._get_file_path(new_manifest_dict['index_non_lemma_file']))
+
+        self._write_atomically(new_manifest_dict['pair_count_file'], lambda output_file: output_file.writelines(
+            f'{count}\t{lemma}\t{non_lemma}\n' for (lemma, non_lemma), count in pair_count_dict.items()))
+        self._write_atomically(self.manifest_file_name, lambda output_file: json.dump(new_manifest_dict, output_file, indent=2))
+
+        if (has_saved_version):
+            self._remove_files(self.manifest_dict, new_manifest_dict)
+
+        self.pair_count_dict = pair_count_dict
+        self.manifest_dict = new_manifest_dict
+
+
+    def save(self):
+        self._commit(self.pair_count_dict, self.manifest_dict)
+
+
+    def _apply_dump(self, pair_count_dict, manifest_dict, dump_name, added_file_path, removed_file_path):
+        # only the lemmatizer run over the whole dump is avoided, the indexes are rebuilt from all pair counts,
+        # the counts and the manifest are changed on copies that replace the current ones once they are saved
+        if (dump_name in manifest_dict['applied_dumps']):
+            print(f'Dump {dump_name} has already been applied')
+            return False
+
+        pair_count_dict = dict(pair_count_dict)
+        manifest_dict = {**manifest_dict, 'applied_dumps': dict(manifest_dict['applied_dumps'])}
+
+        dump_dict = {'applied_at': datetime.datetime.now().isoformat(timespec='seconds')}
+        if (removed_file_path is not None):
+            self._update_pair_counts(pair_count_dict, removed_file_path, -1)
+            dump_dict['removed_file_hash'] = calc_file_hash(removed_file_path)
+        if (added_file_path is not None):
+            self._update_pair_counts(pair_count_dict, added_file_path, 1)
+            dump_dict['added_file_hash'] = calc_file_hash(added_file_path)
+
+        manifest_dict['applied_dumps'][dump_name] = dump_dict
+        self._commit(pair_count_dict, manifest_dict)
+        
+        return True
+
+
+    def apply_dump(self, dump_name, added_file_path=None, removed_file_path=None):
+        return self._apply_dump(self.pair_count_dict, self.manifest_dict, dump_name, added_file_path, removed_file_path)
+
+
+    def create_index(self, input_file_path, dump_name=None):
+        # the files of the current version are removed when the new index is saved
+        return self._apply_dump({}, {'applied_dumps': {}}, dump_name or os.path.basename(input_file_path), input_file_path, None)
+
+
+    def load_index_lemma(self):
+        index_lemma = IndexLemma()
+        index_lemma.load_index(self._get_file_path(self._get_file_name(self.manifest_dict, 'index_lemma_file')))
+        
+        return index_lemma
+
+
+    def load_index_non_lemma(self):
+        index_non_lemma = IndexNonLemma()
+        index_non_lemma.load_index(self._get_file_path(self._get_file_name(self.manifest_dict, 'index_non_lemma_file')))
+        
+        return index_non_lemma
@@ -0,0 +1,193 @@
+import os
+import sys
+import mmap
+import array
+import struct
+import bisect
+
+
+
+INDEX_MAGIC = b'SKWIDX01'
+INDEX_KIND_LEMMA = 1
+INDEX_KIND_NON_LEMMA = 2
+INDEX_KIND_FUZZY = 3
+# kinds whose values are sets of strings, the others map to a single string
+SET_VALUED_INDEX_KINDS = (INDEX_KIND_LEMMA, INDEX_KIND_FUZZY)
+
+# magic, kind, string count, string blob size, key count, posting count
+HEADER_STRUCT = struct.Struct('<8sIIIII4x')
+
+
+def _to_uint32_array(values):
+    uint32_array = array.array('I', values)
+    # the file is always little-endian so it can be cast in place on common platforms
+    if (sys.byteorder != 'little'):
+        uint32_array.byteswap()
+    return uint32_array
+
+
+def write_index(index_dict, kind, output_file_path):
+    # every key and value goes into one sorted string table, keys and postings refer to it by id
+    string_set = set(index_dict)
+    for value in index_dict.values():
+        if (kind in SET_VALUED_INDEX_KINDS):
+            string_set.update(value)
+        else:
+            string_set.add(value)
+
+    encoded_string_list = sorted(string.encode('UTF-8') for string in string_set)
+    string_id_dict = {string.decode('UTF-8'): string_id for string_id, string in enumerate(encoded_string_list)}
+
+    string_offsets = [0]
+    for string in encoded_string_list:
+        string_offsets.append(string_offsets[-1] + len(string))
+
+    key_ids = sorted(string_id_dict[key] for key in index_dict)
+    posting_offsets = [0]
+    postings = []
+    for key_id in key_ids:
+        value = index_dict[encoded_string_list[key_id].decode('UTF-8')]
+        if (kind in SET_VALUED_INDEX_KINDS):
+            postings.extend(sorted(string_id_dict[string] for string in value))
+        else:
+            postings.append(string_id_dict[value])
+        posting_offsets.append(len(postings))
+
+    temp_file_path = output_file_path + '.tmp'
+    with open(temp_file_path, 'wb') as output_file:
+        output_file.write(HEADER_STRUCT.pack(INDEX_MAGIC, kind, len(encoded_string_list), string_offsets[-1], len(key_ids), len(postings)))
+        _to_uint32_array(string_offsets).tofile(output_file)
+        _to_uint32_array(key_ids).tofile(output_file)
+        _to_uint32_array(posting_offsets).tofile(output_file)
+        _to_uint32_array(postings).tofile(output_file)
+        output_file.write(b''.join(encoded_string_list))
+    os.replace(temp_file_path, output_file_path)
+
+
+def read_index_kind(index_file_path):
+    with open(index_file_path, 'rb') as index_file:
+        magic, kind, *_ = HEADER_STRUCT.unpack(index_file.read(HEADER_STRUCT.size))
+
+    if (magic != INDEX_MAGIC):
+        raise ValueError(f'{index_file_path} is not a lemmatizer index file')
+
+    return kind
+
+
+
+class MmapIndexDict:
+
+    def __init__(self, index_file_path):
+        with open(index_file_path, 'rb') as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.kind, string_count, blob_size, key_count, posting_count = HEADER_STRUCT.unpack_from(self._mmap)
+        if (magic != INDEX_MAGIC):
+            raise ValueError(f'{index_file_path} is not a lemmatizer index file')
+
+        offset = HEADER_STRUCT.size
+        self._string_offsets, offset = self._read_uint32_array(offset, string_count + 1)
+        self._key_ids, offset = self._read_uint32_array(offset, key_count)
+        self._posting_offsets, offset = self._read_uint32_array(offset, key_count + 1)
+        self._postings, offset = self._read_uint32_array(offset, posting_count)
+        self._blob_offset = offset
+
+
+    def _read_uint32_array(self, offset, count):
+        end = offset + 4 * count
+
+        if (sys.byteorder == 'little'):
+            values = memoryview(self._mmap)[offset:end].cast('I')
+        else:
+            values = array.array('I', self._mmap[offset:end])
+            values.byteswap()
+
+        return (values, end)
+
+
+    def _get_encoded_string(self, string_id):
+        return self._mmap[self._blob_offset + self._string_offsets[string_id]:self._blob_offset + self._string_offsets[string_id + 1]]
+
+
+    def _get_string(self, string_id):
+        return self._get_encoded_string(string_id).decode('UTF-8')
+
+
+    def _find_string_id(self, string):
+        encoded_string = string.encode('UTF-8')
+        lo = 0
+        hi = len(self._string_offsets) - 1
+
+        while (lo < hi):
+            mid = (lo + hi) // 2
+            if (self._get_encoded_string(mid) < encoded_string):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if (lo < len(self._string_offsets) - 1 and self._get_encoded_string(lo) == encoded_string):
+            return lo
+        return -1
+
+
+    def _find_key_idx(self, key):
+        if (not isinstance(key, str)):
+            return -1
+
+        string_id = self._find_string_id(key)
+        if (string_id < 0):
+            return -1
+
+        key_idx = bisect.bisect_left(self._key_ids, string_id)
+        if (key_idx < len(self._key_ids) and self._key_ids[key_idx] == string_id):
+            return key_idx
+        return -1
+
+
+    def _get_value(self, key_idx):
+        posting_list = self._postings[self._posting_offsets[key_idx]:self._posting_offsets[key_idx + 1]]
+
+        if (self.kind in SET_VALUED_INDEX_KINDS):
+            return set(self._get_string(string_id) for string_id in posting_list)
+        return self._get_string(posting_list[0])
+
+
+    def __contains__(self, key):
+        return self._find_key_idx(key) >= 0
+
+
+    def __getitem__(self, key):
+        key_idx = self._find_key_idx(key)
+        if (key_idx < 0):
+            raise KeyError(key)
+        return self._get_value(key_idx)
+
+
+    def get(self, key, default=None):
+        key_idx = self._find_key_idx(key)
+        if (key_idx < 0):
+            return default
+        return self._get_value(key_idx)
+
+
+    def __len__(self):
+        return len(self._key_ids)
+
+
+    def __iter__(self):
+        for key_id in self._key_ids:
+            yield self._get_string(key_id)
+
+
+    def keys(self):
+        return iter(self)
+
+
+    def values(self):
+        for key_idx in range(len(self._key_ids)):
+            yield self._get_value(key_idx)
+
+
+    def items(self):
+        for key_idx, key_id in enumerate(self._key_ids):
+            yield (self._get_string(key_id), self._get_value(key_idx))
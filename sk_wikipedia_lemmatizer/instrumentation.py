@@ -0,0 +1,129 @@
+import io
+import json
+import time
+import pstats
+import cProfile
+
+
+
+STAGE_COUNTERS = ('lines_in', 'lines_out', 'matches', 'distance_calls', 'pruned_pairs')
+STAGES = ('read', 'parse', 'clean', 'lemmatize')
+
+
+def count_records(records, pipeline_stats, stage, counter):
+    count = 0
+
+    for record in records:
+        count += 1
+        yield record
+
+    pipeline_stats.add(stage, counter, count)
+
+
+
+class PipelineStats:
+
+    def __init__(self, profile=False):
+        self.stage_dict = {}
+        self.total_seconds = 0.0
+        self.profiler = cProfile.Profile() if (profile) else None
+
+
+    def __getstate__(self):
+        # profilers can not be pickled, worker processes collect counters only
+        state = dict(self.__dict__)
+        state['profiler'] = None
+        return state
+
+
+    def _get_stage(self, stage):
+        if (stage not in self.stage_dict):
+            self.stage_dict[stage] = dict.fromkeys(STAGE_COUNTERS, 0)
+            self.stage_dict[stage]['seconds'] = 0.0
+        return self.stage_dict[stage]
+
+
+    def add(self, stage, counter, value=1):
+        self._get_stage(stage)[counter] += value
+
+
+    def _iter_timed(self, stage, lines, counter, sign):
+        stage_dict = self._get_stage(stage)
+        iterator = iter(lines)
+
+        while (True):
+            start_time = time.perf_counter()
+            try:
+                line = next(iterator)
+            except StopIteration:
+                stage_dict['seconds'] += sign * (time.perf_counter() - start_time)
+                return
+            stage_dict['seconds'] += sign * (time.perf_counter() - start_time)
+            stage_dict[counter] += 1
+            yield line
+
+
+    def instrument_source(self, stage, lines):
+        return self._iter_timed(stage, lines, 'lines_out', 1)
+
+
+    def instrument_stage(self, stage, lines, stage_function):
+        # time spent waiting for the upstream stage is subtracted, so every stage reports its own wall time
+        input_lines = self._iter_timed(stage, lines, 'lines_in', -1)
+        return self._iter_timed(stage, stage_function(input_lines), 'lines_out', 1)
+
+
+    def merge(self, stats_dict):
+        for stage, stage_dict in stats_dict['stages'].items():
+            for counter, value in stage_dict.items():
+                self._get_stage(stage)[counter] += value
+
+
+    def get_profile_report(self, line_count=30):
+        if (self.profiler is None):
+            return None
+
+        report = io.StringIO()
+        try:
+            pstats.Stats(self.profiler, stream=report).sort_stats('cumulative').print_stats(line_count)
+        except TypeError:
+            # nothing was profiled in this process, e.g. the work ran in worker processes
+            return None
+        return report.getvalue()
+
+
+    def to_dict(self):
+        stage_list = [stage for stage in STAGES if (stage in self.stage_dict)] + \
+            [stage for stage in self.stage_dict if (stage not in STAGES)]
+
+        return {
+            'total_seconds': self.total_seconds,
+            'stages': {stage: dict(self.stage_dict[stage]) for stage in stage_list},
+            'profile': self.get_profile_report()
+        }
+
+
+    def save_json(self, output_file_path):
+        with open(output_file_path, 'w', encoding='UTF-8') as output_file:
+            json.dump(self.to_dict(), output_file, indent=2)
+
+
+
+class SparkPipelineStats(PipelineStats):
+
+    # counters are spark accumulators, executors add to them and the driver reads the totals
+    def __init__(self, spark_context):
+        super().__init__()
+        self.accumulator_dict = {(stage, counter): spark_context.accumulator(0) for stage in STAGES for counter in STAGE_COUNTERS}
+
+
+    def add(self, stage, counter, value=1):
+        self.accumulator_dict[(stage, counter)].add(value)
+
+
+    def to_dict(self):
+        for (stage, counter), accumulator in self.accumulator_dict.items():
+            if (accumulator.value):
+                self._get_stage(stage)[counter] = accumulator.value
+
+        return super().to_dict()
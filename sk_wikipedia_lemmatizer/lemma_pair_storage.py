@@ -0,0 +1,132 @@
+import os
+import mmap
+import hashlib
+import struct
+import numpy as np
+
+
+
+LEMMA_PAIR_MAGIC = b'SKWPAIR1'
+# id of the missing non-lemma of lemma-only records
+NO_STRING_ID = 0xFFFFFFFF
+UINT32_DTYPE = np.dtype('<u4')
+
+# magic, string count, string blob size, pair count
+HEADER_STRUCT = struct.Struct('<8sIII')
+
+
+def is_lemma_pair_file(input_file_path):
+    with open(input_file_path, 'rb') as input_file:
+        return input_file.read(len(LEMMA_PAIR_MAGIC)) == LEMMA_PAIR_MAGIC
+
+
+def calc_file_hash(file_path):
+    file_hash = hashlib.sha256()
+    
+    with open(file_path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(1024 * 1024), b''):
+            file_hash.update(block)
+            
+    return file_hash.hexdigest()
+
+
+
+class LemmaPairWriter:
+
+    # every distinct (lemma, non-lemma) pair is stored once with its count, in the order of its first occurrence,
+    # strings are stored once in a dictionary and the pairs refer to them by fixed-width ids
+    def __init__(self, output_file_path):
+        self.output_file_path = output_file_path
+        self.string_id_dict = {}
+        self.pair_count_dict = {}
+
+
+    def _get_string_id(self, string):
+        string_id = self.string_id_dict.get(string)
+
+        if (string_id is None):
+            string_id = len(self.string_id_dict)
+            self.string_id_dict[string] = string_id
+
+        return string_id
+
+
+    def add(self, lemma, non_lemma=None, count=1):
+        pair_key = (self._get_string_id(lemma) << 32) | (self._get_string_id(non_lemma) if (non_lemma) else NO_STRING_ID)
+        self.pair_count_dict[pair_key] = self.pair_count_dict.get(pair_key, 0) + count
+
+
+    def add_line(self, line):
+        lemma, _, non_lemma = line.partition('|')
+        self.add(lemma, non_lemma)
+
+
+    def close(self):
+        encoded_string_list = [string.encode('UTF-8') for string in self.string_id_dict]
+        string_offsets = np.zeros(len(encoded_string_list) + 1, dtype=UINT32_DTYPE)
+        string_offsets[1:] = np.cumsum([len(string) for string in encoded_string_list], dtype=np.int64)
+
+        pair_keys = np.fromiter(self.pair_count_dict.keys(), dtype=np.uint64, count=len(self.pair_count_dict))
+        counts = np.fromiter(self.pair_count_dict.values(), dtype=np.uint64, count=len(self.pair_count_dict))
+
+        temp_file_path = self.output_file_path + '.tmp'
+        with open(temp_file_path, 'wb') as output_file:
+            output_file.write(HEADER_STRUCT.pack(LEMMA_PAIR_MAGIC, len(encoded_string_list), int(string_offsets[-1]), len(pair_keys)))
+            string_offsets.tofile(output_file)
+            (pair_keys >> np.uint64(32)).astype(UINT32_DTYPE).tofile(output_file)
+            (pair_keys & np.uint64(0xFFFFFFFF)).astype(UINT32_DTYPE).tofile(output_file)
+            counts.astype(UINT32_DTYPE).tofile(output_file)
+            output_file.write(b''.join(encoded_string_list))
+        os.replace(temp_file_path, self.output_file_path)
+
+        self.string_id_dict = {}
+        self.pair_count_dict = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if (exc_type is None):
+            self.close()
+
+
+
+def write_lemma_pairs(lemma_pairs, output_file_path):
+    with LemmaPairWriter(output_file_path) as writer:
+        for lemma, non_lemma, count in lemma_pairs:
+            writer.add(lemma, non_lemma, count)
+
+
+def read_lemma_pair_arrays(input_file_path):
+    # returns the string list and the lemma id, non-lemma id and count arrays of all pairs
+    with open(input_file_path, 'rb') as input_file:
+        data = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        magic, string_count, blob_size, pair_count = HEADER_STRUCT.unpack_from(data)
+        if (magic != LEMMA_PAIR_MAGIC):
+            raise ValueError(f'{input_file_path} is not a lemma pair file')
+
+        offset = HEADER_STRUCT.size
+        arrays = []
+        for count in (string_count + 1, pair_count, pair_count, pair_count):
+            # copied out of the mapping, so the file can be closed before the arrays are used
+            arrays.append(np.frombuffer(data, dtype=UINT32_DTYPE, count=count, offset=offset).astype(np.uint32))
+            offset += UINT32_DTYPE.itemsize * count
+        string_offsets, lemma_ids, non_lemma_ids, counts = arrays
+
+        blob = data[offset:offset + blob_size]
+        string_list = [blob[start:end].decode('UTF-8') for start, end in zip(string_offsets[:-1].tolist(), string_offsets[1:].tolist())]
+    finally:
+        data.close()
+
+    return (string_list, lemma_ids, non_lemma_ids, counts)
+
+
+def iter_lemma_pairs(input_file_path):
+    string_list, lemma_ids, non_lemma_ids, counts = read_lemma_pair_arrays(input_file_path)
+
+    for lemma_id, non_lemma_id, count in zip(lemma_ids.tolist(), non_lemma_ids.tolist(), counts.tolist()):
+        yield (string_list[lemma_id], string_list[non_lemma_id] if (non_lemma_id != NO_STRING_ID) else None, count)
@@ -1,13 +1,42 @@
-import re
-import html
-import numpy as np
+import os
+import glob
+import json
+import time
+import shutil
+import operator
+import itertools
+import multiprocessing
+import pandas as pd
 import pyspark
 from pyspark.sql import SparkSession
+from pyspark.sql import functions as F
+from pyspark.sql.types import ArrayType, StringType
+from levenshtein import calc_modified_levenshtein_distance, calc_modified_levenshtein_distances, create_first_char_buckets, filter_candidate_non_lemmas
+from wiki_reader import read_page_lines, read_dump_page_texts
+from instrumentation import PipelineStats, SparkPipelineStats, count_records
+from lemma_pair_storage import LemmaPairWriter, calc_file_hash, write_lemma_pairs, iter_lemma_pairs
+from normalizer import LINK_PATTERN, find_links, contains_link, remove_disambiguation, normalize_line, contains_ascii_letters
 
 
 
 class BaseWikiLemmatizer:
 
+    instrumentation_enabled = False
+    profile_enabled = False
+    pipeline_stats = None
+
+
+    def enable_instrumentation(self, profile=False):
+        self.instrumentation_enabled = True
+        self.profile_enabled = profile
+
+
+    def get_instrumentation_report(self):
+        if (self.pipeline_stats is None):
+            return None
+        return self.pipeline_stats.to_dict()
+
+
     def print_first_n_lines_of_file(self, file_path, n):
         count = 0
         
@@ -21,9 +50,7 @@ class BaseWikiLemmatizer:
 
 
     def _check_if_string_contains_any_letters(self, string):
-        if (string and re.search('[a-zA-Z]', string)): 
-            return True
-        return False
+        return contains_ascii_letters(string)
 
 
     def _get_link_and_anchor_text(self, line, separator):
@@ -59,158 +86,29 @@ class BaseWikiLemmatizer:
 
 
     def _calc_modified_levenshtein_distance(self, lemma, non_lemma):
-        if (len(lemma) > len(non_lemma) or abs(len(lemma) - len(non_lemma)) > 3):
-            return -1
-        
-        prefix_match_count = 0
-        for idx, c in enumerate(lemma):
-            if (lemma[idx] == non_lemma[idx]):
-                prefix_match_count += 1
-                
-        if (prefix_match_count < 0.75 * len(lemma)):
-            return -1
-        
-        distances = np.zeros((len(lemma) + 1, len(non_lemma) + 1))
-
-        for t1 in range(len(lemma) + 1):
-            distances[t1][0] = t1
-        for t2 in range(len(non_lemma) + 1):
-            distances[0][t2] = t2
-        
-        for t1 in range(1, len(lemma) + 1):
-            for t2 in range(1, len(non_lemma) + 1):
-                if (lemma[t1 - 1] == non_lemma[t2 - 1]):
-                    distances[t1][t2] = distances[t1 - 1][t2 - 1]
-                else:
-                    a = distances[t1][t2 - 1]
-                    b = distances[t1 - 1][t2]
-                    c = distances[t1 - 1][t2 - 1]
-                    distances[t1][t2] = 1 + min(a, b, c)
-
-        return int(distances[len(lemma)][len(non_lemma)])
+        return calc_modified_levenshtein_distance(lemma, non_lemma)
 
 
-
-class WikiLemmatizer(BaseWikiLemmatizer):
-
-    parsed_file_path = 'data/parsed.csv'
-    cleaned_file_path = 'data/cleaned.csv'
-
-
-    def _parse_data(self, input_file_path, output_file_path):
-        expression_1 = '\[\[([^|\]]+)\|?([^|\]]+)?\]\]([a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ]+)?'
-        expression_2 = '\(.*\)'
-
-        with open(input_file_path, 'r', encoding='UTF-8') as input_file, open(output_file_path, 'w', encoding='UTF-8') as output_file:
-            for line in input_file:  
-                # parse link and anchor text
-                match_list = re.findall(expression_1, line)
-                
-                for match in match_list:
-                    link = match[0]
-                    # remove disambiguation text from link
-                    link = re.sub(expression_2, '', link)
-                    anchor_text = match[1]
-                    anchor_text_substring = match[2]
-            
-                    if (anchor_text != ''):
-                        output_file.write(f'{link}|{anchor_text}\n')
-                    elif (anchor_text_substring != ''):
-                        anchor_text = link + anchor_text_substring
-                        output_file.write(f'{link}|{anchor_text}\n')
-                    else:
-                        output_file.write(f'{link}\n')
-
-
-    def _clean_data(self, input_file_path, output_file_path):
-        expression = '[^a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ|]+'
-
-        with open(input_file_path, 'r', encoding='UTF-8') as input_file, open(output_file_path, 'w', encoding='UTF-8') as output_file:
-            for line in input_file:
-                line = html.unescape(line)
-                line = line.replace('&nbsp;', ' ')
-                line = line.replace('&amp;', ' ')
-                line = re.sub(expression, ' ', line)
-                line = line.strip()
-                
-                if (self._check_if_string_contains_any_letters(line)): 
-                    output_file.write(line + '\n')
-
-
-    def _tokenize_and_lemmatize_data(self, input_file_path, output_file_path):
-        max_word_count = 3
-        miss_word_count = 0
-        stop_words = set(line.strip() for line in open('stop_words.txt', 'r', encoding='UTF-8'))
-        
-        with open(input_file_path, 'r', encoding='UTF-8') as input_file, open(output_file_path, 'w', encoding='UTF-8') as output_file:
-            for line in input_file:
-                link, anchor_text = self._get_link_and_anchor_text(line, '|')    
-                link_list = link.split()
-                link_list = self._clean_tokenized_string_list(link_list, stop_words)
-                
-                anchor_text_list = [] 
-                if (anchor_text):
-                    anchor_text_list = anchor_text.split()
-                    anchor_text_list = self._clean_tokenized_string_list(anchor_text_list, stop_words)
-                
-                if (len(link_list) > 0):                     
-                    if (len(anchor_text_list) > 0):
-                        if (len(link_list) != len(anchor_text_list)):
-                            miss_word_count += 1
-                            
-                        for idx, lemma in enumerate(link_list):
-                            if ((idx + 1) > max_word_count):
-                                break
-                            
-                            is_levenshtein_distance_matched = False
-                            
-                            # get all non-lemmas
-                            for non_lemma in anchor_text_list:
-                                levenshtein_distance = self._calc_modified_levenshtein_distance(lemma, non_lemma)
-                            
-                                if (levenshtein_distance > 0 and levenshtein_distance <= 3):
-                                    is_levenshtein_distance_matched = True
-                                    output_file.write(lemma + '|' + non_lemma + '\n')
-
-                            if (is_levenshtein_distance_matched == False):
-                                output_file.write(lemma + '\n')
-                    else:
-                        for idx, lemma in enumerate(link_list):
-                            if ((idx + 1) > max_word_count):
-                                break
-                            
-                            output_file.write(lemma + '\n')
-                    
-        return miss_word_count
-
-
-    def lemmatize(self, input_file_path, output_file_path):
-        print('Starting lemmatization process')
-
-        self._parse_data(input_file_path, self.parsed_file_path)
-        print('Parsing process has finished')
-
-        self._clean_data(self.parsed_file_path, self.cleaned_file_path)
-        print('Cleaning process has finished')
-
-        miss_word_count = self._tokenize_and_lemmatize_data(self.cleaned_file_path, output_file_path) 
-        print('Lemmatization process has finished')
-        print(f'The number of records for which the number of words in the link and the anchor text did not match: {miss_word_count}')
+    def _calc_modified_levenshtein_distances(self, lemma, non_lemma_list, max_distance=3):
+        return calc_modified_levenshtein_distances(lemma, non_lemma_list, max_distance)
 
 
+    def _load_stop_words(self, file_path='stop_words.txt'):
+        with open(file_path, 'r', encoding='UTF-8') as input_file:
+            return set(line.strip() for line in input_file)
 
-class PysparkWikiLemmatizer(BaseWikiLemmatizer):
 
     def _parse_line(self, line):
-        expression_1 = '\[\[([^|\]]+)\|?([^|\]]+)?\]\]([a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ]+)?'
-        expression_2 = '\(.*\)'
-        match_list = re.findall(expression_1, line)
+        match_list = find_links(line)
         parsed_match_list = []
+        
+        if (self.pipeline_stats is not None):
+            self.pipeline_stats.add('parse', 'matches', len(match_list))
 
         for match in match_list:
             link = match[0]
             # remove disambiguation text from link
-            link = re.sub(expression_2, '', link)
+            link = remove_disambiguation(link)
             anchor_text = match[1]
             anchor_text_substring = match[2]
 
@@ -226,35 +124,11 @@ class PysparkWikiLemmatizer(BaseWikiLemmatizer):
 
 
     def _clean_line(self, line):
-        expression = "[^a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ|]+"
-        
-        line = html.unescape(line)
-        line = line.replace('&nbsp;', ' ').replace('&amp;', ' ')
-        line = re.sub(expression, ' ', line)
-        line = line.strip()
-        
-        return line
+        return normalize_line(line)
 
 
-    def _parse_and_clean_data(self, spark_session, input_file_path):
-        expression = '\[\[([^|\]]+)\|?([^|\]]+)?\]\]([a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ]+)?'
-
-        parsed_rdd = spark_session.read.format('com.databricks.spark.xml') \
-            .option('rowTag', 'page') \
-            .load(input_file_path) \
-            .rdd.map(lambda row_obj: str(row_obj.revision.text._VALUE) if row_obj.revision and row_obj.revision.text else '') \
-            .filter(lambda line: re.search(expression, line)) \
-            .flatMap(lambda line: self._parse_line(line)) \
-            .map(lambda line: self._clean_line(line)) \
-            .filter(lambda line: self._check_if_string_contains_any_letters(line))
-            
-        return parsed_rdd
-
-
-    def _tokenize_and_lemmatize_line(self, line, stop_words):
-        lemmatized_list = []
+    def _tokenize_line(self, line, stop_words):
         link, anchor_text = self._get_link_and_anchor_text(line, '|')    
-        max_word_count = 3
         
         link_list = link.split()
         link_list = self._clean_tokenized_string_list(link_list, stop_words)
@@ -263,22 +137,38 @@ class PysparkWikiLemmatizer(BaseWikiLemmatizer):
         if (anchor_text):
             anchor_text_list = anchor_text.split()
             anchor_text_list = self._clean_tokenized_string_list(anchor_text_list, stop_words)
+
+        return (link_list, anchor_text_list)
+
+
+    def _lemmatize_tokens(self, link_list, anchor_text_list):
+        lemmatized_list = []
+        max_word_count = 3
             
         if (len(link_list) > 0):                     
             if (len(anchor_text_list) > 0):
+                first_char_buckets = create_first_char_buckets(anchor_text_list)
+
                 for idx, lemma in enumerate(link_list):
                     if ((idx + 1) > max_word_count):
                         break
 
                     is_levenshtein_distance_matched = False
 
-                    # get all non-lemmas
-                    for non_lemma in anchor_text_list:
-                        levenshtein_distance = self._calc_modified_levenshtein_distance(lemma, non_lemma)
+                    # get all non-lemmas, pairs that can not be within the distance are rejected before the distance is calculated
+                    candidate_list = filter_candidate_non_lemmas(lemma, anchor_text_list, 3, first_char_buckets)
+                    levenshtein_distance_list = self._calc_modified_levenshtein_distances(lemma, candidate_list)
+                    for non_lemma, levenshtein_distance in zip(candidate_list, levenshtein_distance_list):
 
                         if (levenshtein_distance > 0 and levenshtein_distance <= 3):
                             is_levenshtein_distance_matched = True
                             lemmatized_list.append(lemma + '|' + non_lemma)
+                    
+                    if (self.pipeline_stats is not None):
+                        self.pipeline_stats.add('lemmatize', 'distance_calls', len(candidate_list))
+                        self.pipeline_stats.add('lemmatize', 'pruned_pairs', len(anchor_text_list) - len(candidate_list))
+                        if (is_levenshtein_distance_matched):
+                            self.pipeline_stats.add('lemmatize', 'matches')
 
                     if (is_levenshtein_distance_matched == False):
                         lemmatized_list.append(lemma)
@@ -292,28 +182,713 @@ class PysparkWikiLemmatizer(BaseWikiLemmatizer):
         return lemmatized_list
 
 
+    def _tokenize_and_lemmatize_line(self, line, stop_words):
+        link_list, anchor_text_list = self._tokenize_line(line, stop_words)
+
+        return self._lemmatize_tokens(link_list, anchor_text_list)
+
+
+
+class WikiLemmatizer(BaseWikiLemmatizer):
+
+    # text writes lemma|non-lemma lines, pairs the compact lemma pair file of lemma_pair_storage
+    output_formats = ('text', 'pairs')
+    parsed_file_path = 'data/parsed.csv'
+    cleaned_file_path = 'data/cleaned.csv'
+    lemmatized_file_path = 'data/lemmatized.csv'
+    write_buffer_size = 1024 * 1024
+    checkpoint_interval = None
+    input_hash = None
+    output_format = 'text'
+
+
+    def __init__(self, multistream_index_file_path=None, decompression_processes=None):
+        self.multistream_index_file_path = multistream_index_file_path
+        self.decompression_processes = decompression_processes
+
+
+    def enable_checkpointing(self, checkpoint_interval=10000):
+        # a checkpoint is written after every checkpoint_interval pages of a compressed dump or lines of a text input
+        self.checkpoint_interval = checkpoint_interval
+
+
+    def _get_stage_file_path(self, file_path):
+        if (self.input_hash is None):
+            return file_path
+
+        # intermediate files of different inputs do not overwrite each other
+        root, extension = os.path.splitext(file_path)
+        return f'{root}-{self.input_hash[:16]}{extension}'
+
+
+    def _save_checkpoint(self, checkpoint_dict, checkpoint_file_path):
+        temp_file_path = checkpoint_file_path + '.tmp'
+
+        with open(temp_file_path, 'w', encoding='UTF-8') as checkpoint_file:
+            json.dump(checkpoint_dict, checkpoint_file, indent=2)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temp_file_path, checkpoint_file_path)
+
+
+    def _load_checkpoint(self, output_file_path, input_key, start=0):
+        checkpoint_dict = {'input_key': input_key, 'input_offset': start, 'input_records': 0, 'output_offset': 0, 'stats': {}, 'completed': False}
+        checkpoint_file_path = output_file_path + '.checkpoint'
+
+        if (os.path.exists(checkpoint_file_path)):
+            with open(checkpoint_file_path, 'r', encoding='UTF-8') as checkpoint_file:
+                saved_checkpoint_dict = json.load(checkpoint_file)
+
+            # a checkpoint of another input or of an output that was changed afterwards is not used,
+            # only an unfinished output may continue past the checkpoint
+            output_size = os.path.getsize(output_file_path) if (os.path.exists(output_file_path)) else -1
+            if (saved_checkpoint_dict['input_key'] == input_key and (output_size == saved_checkpoint_dict['output_offset'] or 
+                    (output_size > saved_checkpoint_dict['output_offset'] and not saved_checkpoint_dict['completed']))):
+                checkpoint_dict = saved_checkpoint_dict
+
+        return checkpoint_dict
+
+
+    def _decode_input_line(self, line):
+        line = line.decode('UTF-8')
+
+        # same universal newline handling as a file opened in text mode
+        if ('\r' in line):
+            return line.replace('\r\n', '\n').replace('\r', '\n').splitlines(True)
+        return [line]
+
+
+    def _read_input_batches(self, input_file_path, input_offset, input_records, end=None):
+        # yields (lines, input offset after the batch, number of pages or lines in the batch)
+        if (input_file_path.endswith('.bz2')):
+            # a bz2 stream can not be entered at a byte offset, the finished pages are read again and skipped
+            page_texts = itertools.islice(read_dump_page_texts(input_file_path, self.multistream_index_file_path, self.decompression_processes), input_records, None)
+            
+            while (True):
+                page_text_list = list(itertools.islice(page_texts, self.checkpoint_interval))
+                if (not page_text_list):
+                    return
+                yield ([line for text in page_text_list for line in text.split('\n')], None, len(page_text_list))
+        else:
+            with open(input_file_path, 'rb') as input_file:
+                input_file.seek(input_offset)
+                
+                while (True):
+                    line_list = []
+                    while (len(line_list) < self.checkpoint_interval and (end is None or input_file.tell() < end)):
+                        line = input_file.readline()
+                        if (not line):
+                            break
+                        line_list.append(line)
+
+                    if (not line_list):
+                        return
+                    yield ([sub_line for line in line_list for sub_line in self._decode_input_line(line)], input_file.tell(), len(line_list))
+
+
+    def _run_checkpointed(self, input_file_path, output_file_path, lines_function, stats_dict, input_key=None, start=0, end=None):
+        checkpoint_file_path = output_file_path + '.checkpoint'
+        checkpoint_dict = self._load_checkpoint(output_file_path, input_key or self.input_hash, start)
+        stats_dict.update(checkpoint_dict['stats'])
+
+        if (checkpoint_dict['completed']):
+            print(f'{output_file_path} is up to date, skipping')
+            return
+        if (checkpoint_dict['input_records'] > 0):
+            print(f"Resuming {output_file_path} after {checkpoint_dict['input_records']} input records")
+
+        with open(output_file_path, 'a', encoding='UTF-8', buffering=self.write_buffer_size) as output_file:
+            # lines written after the last checkpoint are discarded and produced again
+            output_file.truncate(checkpoint_dict['output_offset'])
+
+            for lines, input_offset, record_count in self._read_input_batches(input_file_path, checkpoint_dict['input_offset'], checkpoint_dict['input_records'], end):
+                output_file.writelines(line + '\n' for line in lines_function(lines))
+                # the output has to be on disk before the checkpoint refers to it
+                output_file.flush()
+                os.fsync(output_file.fileno())
+
+                checkpoint_dict['input_offset'] = input_offset
+                checkpoint_dict['input_records'] += record_count
+                checkpoint_dict['output_offset'] = os.fstat(output_file.fileno()).st_size
+                checkpoint_dict['stats'] = dict(stats_dict)
+                self._save_checkpoint(checkpoint_dict, checkpoint_file_path)
+
+        checkpoint_dict['completed'] = True
+        self._save_checkpoint(checkpoint_dict, checkpoint_file_path)
+
+
+    def _read_input_lines(self, input_file_path):
+        # compressed dumps are streamed page by page without decompressing them to disk, only their page texts
+        # are read, a plain input is read line by line including the XML markup and elements outside the page text
+        if (input_file_path.endswith('.bz2')):
+            for line in read_page_lines(input_file_path, self.multistream_index_file_path, self.decompression_processes):
+                yield line
+        else:
+            with open(input_file_path, 'r', encoding='UTF-8') as input_file:
+                for line in input_file:
+                    yield line
+
+
+    def _parse_lines(self, lines):
+        for line in lines:
+            # parse link and anchor text
+            for parsed_line in self._parse_line(line):
+                yield parsed_line
+
+
+    def _clean_lines(self, lines):
+        for line in lines:
+            line = self._clean_line(line)
+            
+            if (self._check_if_string_contains_any_letters(line)): 
+                yield line
+
+
+    def _tokenize_and_lemmatize_lines(self, lines, stop_words, stats_dict):
+        profiler = self.pipeline_stats.profiler if (self.pipeline_stats is not None) else None
+        
+        for line in lines:
+            if (profiler is not None):
+                profiler.enable()
+                
+            link_list, anchor_text_list = self._tokenize_line(line, stop_words)
+
+            if (len(link_list) > 0 and len(anchor_text_list) > 0 and len(link_list) != len(anchor_text_list)):
+                stats_dict['miss_word_count'] += 1
+                
+            lemmatized_list = self._lemmatize_tokens(link_list, anchor_text_list)
+            
+            if (profiler is not None):
+                profiler.disable()
+
+            for lemmatized_line in lemmatized_list:
+                yield lemmatized_line
+
+
+    def _run_read_stage(self, lines):
+        if (self.pipeline_stats is None):
+            return lines
+        return self.pipeline_stats.instrument_source('read', lines)
+
+
+    def _run_stage(self, stage, lines, stage_function):
+        if (self.pipeline_stats is None):
+            return stage_function(lines)
+        return self.pipeline_stats.instrument_stage(stage, lines, stage_function)
+
+
+    def _write_lines(self, lines, output_file_path):
+        with open(output_file_path, 'w', encoding='UTF-8', buffering=self.write_buffer_size) as output_file:
+            output_file.writelines(line + '\n' for line in lines)
+
+
+    def _write_output(self, lemmatized_lines, output_file_path):
+        if (self.output_format == 'text'):
+            self._write_lines(lemmatized_lines, output_file_path)
+            return
+
+        with LemmaPairWriter(output_file_path) as writer:
+            for line in lemmatized_lines:
+                writer.add_line(line)
+
+
+    def _convert_to_lemma_pairs(self, input_file_path, output_file_path):
+        with open(input_file_path, 'r', encoding='UTF-8') as input_file, LemmaPairWriter(output_file_path) as writer:
+            for line in input_file:
+                writer.add_line(line.rstrip('\n'))
+
+
+    def _parse_data(self, input_file_path, output_file_path):
+        if (self.input_hash is not None):
+            self._run_checkpointed(input_file_path, output_file_path, lambda lines: self._run_stage('parse', self._run_read_stage(lines), self._parse_lines), {})
+            return
+
+        input_lines = self._run_read_stage(self._read_input_lines(input_file_path))
+        self._write_lines(self._run_stage('parse', input_lines, self._parse_lines), output_file_path)
+
+
+    def _clean_data(self, input_file_path, output_file_path):
+        if (self.input_hash is not None):
+            self._run_checkpointed(input_file_path, output_file_path, lambda lines: self._run_stage('clean', lines, self._clean_lines), {})
+            return
+
+        with open(input_file_path, 'r', encoding='UTF-8') as input_file:
+            self._write_lines(self._run_stage('clean', input_file, self._clean_lines), output_file_path)
+
+
+    def _tokenize_and_lemmatize_data(self, input_file_path, output_file_path):
+        stats_dict = {'miss_word_count': 0}
+        stop_words = self._load_stop_words()
+
+        if (self.input_hash is not None):
+            self._run_checkpointed(input_file_path, output_file_path, lambda lines: self._run_stage('lemmatize', lines, 
+                                   lambda cleaned_lines: self._tokenize_and_lemmatize_lines(cleaned_lines, stop_words, stats_dict)), stats_dict)
+            return stats_dict['miss_word_count']
+        
+        with open(input_file_path, 'r', encoding='UTF-8') as input_file:
+            lemmatized_lines = self._run_stage('lemmatize', input_file, lambda lines: self._tokenize_and_lemmatize_lines(lines, stop_words, stats_dict))
+            self._write_output(lemmatized_lines, output_file_path)
+                    
+        return stats_dict['miss_word_count']
+
+
+    def _lemmatize_pipeline(self, input_lines, stop_words, stats_dict):
+        # parse -> clean -> tokenize/lemmatize line by line, only the final output touches the disk
+        input_lines = self._run_read_stage(input_lines)
+        parsed_lines = self._run_stage('parse', input_lines, self._parse_lines)
+        cleaned_lines = self._run_stage('clean', parsed_lines, self._clean_lines)
+        
+        return self._run_stage('lemmatize', cleaned_lines, lambda lines: self._tokenize_and_lemmatize_lines(lines, stop_words, stats_dict))
+
+
+    def _lemmatize_lines(self, input_lines, output_file_path):
+        stats_dict = {'miss_word_count': 0}
+        stop_words = self._load_stop_words()
+        self._write_output(self._lemmatize_pipeline(input_lines, stop_words, stats_dict), output_file_path)
+
+        return stats_dict['miss_word_count']
+
+
+    def _lemmatize_stream(self, input_file_path, output_file_path):
+        if (self.input_hash is not None):
+            stats_dict = {'miss_word_count': 0}
+            stop_words = self._load_stop_words()
+            self._run_checkpointed(input_file_path, output_file_path, lambda lines: self._lemmatize_pipeline(lines, stop_words, stats_dict), stats_dict)
+            return stats_dict['miss_word_count']
+
+        return self._lemmatize_lines(self._read_input_lines(input_file_path), output_file_path)
+
+
+    def lemmatize(self, input_file_path, output_file_path, write_intermediate_files=False, output_format='text'):
+        if (output_format not in self.output_formats):
+            raise ValueError(f'output_format must be one of {self.output_formats}')
+
+        print('Starting lemmatization process')
+        self.pipeline_stats = PipelineStats(self.profile_enabled) if (self.instrumentation_enabled) else None
+        start_time = time.perf_counter()
+        # checkpoints and intermediate files are keyed by the hash of the input, a changed input starts over
+        self.input_hash = calc_file_hash(input_file_path) if (self.checkpoint_interval is not None) else None
+        self.output_format = output_format
+        pair_output_file_path = None
+
+        if (output_format == 'pairs' and self.input_hash is not None):
+            # checkpointed runs append text lines, they are converted to the pair format once the run is complete
+            self.output_format = 'text'
+            pair_output_file_path = output_file_path
+            output_file_path = self._get_stage_file_path(self.lemmatized_file_path)
+
+        if (write_intermediate_files):
+            parsed_file_path = self._get_stage_file_path(self.parsed_file_path)
+            cleaned_file_path = self._get_stage_file_path(self.cleaned_file_path)
+
+            self._parse_data(input_file_path, parsed_file_path)
+            print('Parsing process has finished')
+
+            self._clean_data(parsed_file_path, cleaned_file_path)
+            print('Cleaning process has finished')
+
+            miss_word_count = self._tokenize_and_lemmatize_data(cleaned_file_path, output_file_path) 
+        else:
+            miss_word_count = self._lemmatize_stream(input_file_path, output_file_path)
+            print('Parsing process has finished')
+            print('Cleaning process has finished')
+
+        if (pair_output_file_path is not None):
+            self._convert_to_lemma_pairs(output_file_path, pair_output_file_path)
+
+        if (self.pipeline_stats is not None):
+            self.pipeline_stats.total_seconds = time.perf_counter() - start_time
+
+        print('Lemmatization process has finished')
+        print(f'The number of records for which the number of words in the link and the anchor text did not match: {miss_word_count}')
+
+
+
+def _lemmatize_chunk(args):
+    lemmatizer, input_file_path, start, end, output_file_path = args
+    return lemmatizer._lemmatize_chunk(input_file_path, start, end, output_file_path)
+
+
+
+class MultiprocessWikiLemmatizer(WikiLemmatizer):
+
+    chunks_per_process = 4
+
+
+    def __init__(self, processes=None):
+        super().__init__()
+        self.processes = processes or os.cpu_count()
+
+
+    def _get_chunk_boundaries(self, input_file_path, chunk_count):
+        file_size = os.path.getsize(input_file_path)
+        boundaries = [0]
+        
+        with open(input_file_path, 'rb') as input_file:
+            for idx in range(1, chunk_count):
+                offset = max(file_size * idx // chunk_count, boundaries[-1])
+                input_file.seek(offset)
+                # move the boundary to the start of the next line
+                if (offset > 0):
+                    input_file.seek(offset - 1)
+                    input_file.readline()
+                boundaries.append(input_file.tell())
+                
+        boundaries.append(file_size)
+        
+        return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if (start < end)]
+
+
+    def _read_chunk_lines(self, input_file, start, end):
+        input_file.seek(start)
+        
+        while (input_file.tell() < end):
+            line = input_file.readline()
+            if (not line):
+                break
+            
+            for sub_line in self._decode_input_line(line):
+                yield sub_line
+
+
+    def _get_chunk_input_key(self, start, end):
+        # the chunk boundaries depend on the number of processes, a chunk of a run with another number
+        # of processes is not continued even if its byte range happens to be the same
+        return f'{self.input_hash}:{self.processes}x{self.chunks_per_process}:{start}:{end}'
+
+
+    def _remove_stale_chunk_outputs(self, output_file_path, chunk_output_file_paths, chunk_boundaries):
+        # chunk outputs of an interrupted run that split the input differently or read another input
+        chunk_input_key_dict = {chunk_output_file_path: self._get_chunk_input_key(start, end) 
+                                for chunk_output_file_path, (start, end) in zip(chunk_output_file_paths, chunk_boundaries)}
+
+        for chunk_output_file_path in glob.glob(glob.escape(output_file_path) + '.part-*[0-9]'):
+            checkpoint_file_path = chunk_output_file_path + '.checkpoint'
+            input_key = None
+            if (os.path.exists(checkpoint_file_path)):
+                with open(checkpoint_file_path, 'r', encoding='UTF-8') as checkpoint_file:
+                    input_key = json.load(checkpoint_file)['input_key']
+
+            if (chunk_output_file_path not in chunk_input_key_dict or (input_key is not None and input_key != chunk_input_key_dict[chunk_output_file_path])):
+                os.remove(chunk_output_file_path)
+                if (input_key is not None):
+                    os.remove(checkpoint_file_path)
+
+
+    def _lemmatize_chunk(self, input_file_path, start, end, output_file_path):
+        # every chunk counts into its own stats, the parent process merges them
+        self.pipeline_stats = PipelineStats() if (self.instrumentation_enabled) else None
+
+        if (self.input_hash is not None):
+            # every chunk has its own checkpoint, finished chunks are skipped when the run is restarted
+            stats_dict = {'miss_word_count': 0}
+            stop_words = self._load_stop_words()
+            self._run_checkpointed(input_file_path, output_file_path, lambda lines: self._lemmatize_pipeline(lines, stop_words, stats_dict), 
+                                   stats_dict, self._get_chunk_input_key(start, end), start, end)
+            miss_word_count = stats_dict['miss_word_count']
+        else:
+            with open(input_file_path, 'rb') as input_file:
+                miss_word_count = self._lemmatize_lines(self._read_chunk_lines(input_file, start, end), output_file_path)
+
+        return (miss_word_count, self.pipeline_stats.to_dict() if (self.pipeline_stats is not None) else None)
+
+
+    def _merge_chunk_outputs(self, chunk_output_file_paths, output_file_path):
+        if (self.output_format == 'pairs'):
+            # pairs of later chunks are added after the earlier ones, so the order of first occurrence is kept
+            write_lemma_pairs(itertools.chain.from_iterable(iter_lemma_pairs(chunk_output_file_path) for chunk_output_file_path in chunk_output_file_paths), 
+                              output_file_path)
+        else:
+            with open(output_file_path, 'wb') as output_file:
+                for chunk_output_file_path in chunk_output_file_paths:
+                    with open(chunk_output_file_path, 'rb') as chunk_output_file:
+                        shutil.copyfileobj(chunk_output_file, output_file, self.write_buffer_size)
+
+        # the chunk outputs are removed only after the merge, so an interrupted merge can be repeated
+        for chunk_output_file_path in chunk_output_file_paths:
+            os.remove(chunk_output_file_path)
+            if (os.path.exists(chunk_output_file_path + '.checkpoint')):
+                os.remove(chunk_output_file_path + '.checkpoint')
+
+
+    def _lemmatize_stream(self, input_file_path, output_file_path):
+        if (input_file_path.endswith('.bz2')):
+            print('Compressed input can not be split into byte ranges, falling back to the single process lemmatizer')
+            return super()._lemmatize_stream(input_file_path, output_file_path)
+
+        if (self.input_hash is not None):
+            checkpoint_dict = self._load_checkpoint(output_file_path, self.input_hash)
+            if (checkpoint_dict['completed']):
+                print(f'{output_file_path} is up to date, skipping')
+                return checkpoint_dict['stats']['miss_word_count']
+
+        chunk_boundaries = self._get_chunk_boundaries(input_file_path, self.processes * self.chunks_per_process)
+        chunk_output_file_paths = [f'{output_file_path}.part-{idx:05d}' for idx in range(len(chunk_boundaries))]
+        chunk_args = [(self, input_file_path, start, end, chunk_output_file_path) 
+                      for (start, end), chunk_output_file_path in zip(chunk_boundaries, chunk_output_file_paths)]
+        self._remove_stale_chunk_outputs(output_file_path, chunk_output_file_paths, chunk_boundaries)
+
+        with multiprocessing.Pool(self.processes) as pool:
+            # map keeps the chunk order, so the merged output matches the serial run
+            chunk_result_list = pool.map(_lemmatize_chunk, chunk_args, chunksize=1)
+
+        self._merge_chunk_outputs(chunk_output_file_paths, output_file_path)
+        
+        if (self.pipeline_stats is not None):
+            # stage seconds are summed over all workers
+            for _, chunk_stats_dict in chunk_result_list:
+                self.pipeline_stats.merge(chunk_stats_dict)
+
+        miss_word_count = sum(miss_word_count for miss_word_count, _ in chunk_result_list)
+        if (self.input_hash is not None):
+            self._save_checkpoint({'input_key': self.input_hash, 'input_offset': os.path.getsize(input_file_path), 'input_records': None, 
+                                   'output_offset': os.path.getsize(output_file_path), 'stats': {'miss_word_count': miss_word_count}, 'completed': True}, 
+                                  output_file_path + '.checkpoint')
+
+        return miss_word_count
+
+
+
+def _create_clean_udf(pipeline_stats=None):
+    @F.pandas_udf(StringType())
+    def clean_udf(lines: pd.Series) -> pd.Series:
+        if (pipeline_stats is not None):
+            pipeline_stats.add('clean', 'lines_in', len(lines))
+        return lines.map(normalize_line)
+
+    return clean_udf
+
+
+def _create_lemmatize_udf(stop_words_broadcast, pipeline_stats=None):
+    # only the broadcast handle and the accumulators are captured, the lemmatizer is created on the executor
+    @F.pandas_udf(ArrayType(StringType()))
+    def lemmatize_udf(lines: pd.Series) -> pd.Series:
+        lemmatizer = BaseWikiLemmatizer()
+        lemmatizer.pipeline_stats = pipeline_stats
+        stop_words = stop_words_broadcast.value
+        lemmatized_lists = lines.map(lambda line: lemmatizer._tokenize_and_lemmatize_line(line, stop_words))
+        
+        if (pipeline_stats is not None):
+            pipeline_stats.add('lemmatize', 'lines_in', len(lines))
+            pipeline_stats.add('lemmatize', 'lines_out', int(lemmatized_lists.map(len).sum()))
+        return lemmatized_lists
+
+    return lemmatize_udf
+
+
+def _to_lemma_pair_count(line_count):
+    line, count = line_count
+    lemma, _, non_lemma = line.partition('|')
+    
+    return (lemma, non_lemma, count)
+
+
+
+class PysparkWikiLemmatizer(BaseWikiLemmatizer):
+
+    output_formats = ('text', 'parquet', 'collect')
+    execution_modes = ('dataframe', 'rdd')
+    py_files = ('levenshtein.py', 'normalizer.py', 'wiki_reader.py', 'instrumentation.py', 'lemma_pair_storage.py', 'lemmatizer.py')
+    link_expression = LINK_PATTERN.pattern
+    merge_buffer_size = 1024 * 1024
+
+
+    def _count_rdd(self, rdd, stage, counter):
+        pipeline_stats = self.pipeline_stats
+        if (pipeline_stats is None):
+            return rdd
+        return rdd.mapPartitions(lambda records: count_records(records, pipeline_stats, stage, counter))
+
+
+    def _parse_and_clean_data(self, spark_session, input_file_path):
+        page_rdd = spark_session.read.format('com.databricks.spark.xml') \
+            .option('rowTag', 'page') \
+            .load(input_file_path) \
+            .rdd.map(lambda row_obj: str(row_obj.revision.text._VALUE) if row_obj.revision and row_obj.revision.text else '')
+        page_rdd = self._count_rdd(page_rdd, 'read', 'lines_out')
+
+        parsed_rdd = self._count_rdd(page_rdd.filter(lambda line: contains_link(line)), 'parse', 'lines_in') \
+            .flatMap(lambda line: self._parse_line(line))
+        parsed_rdd = self._count_rdd(parsed_rdd, 'parse', 'lines_out')
+        
+        cleaned_rdd = parsed_rdd.map(lambda line: self._clean_line(line)) \
+            .filter(lambda line: self._check_if_string_contains_any_letters(line))
+            
+        return self._count_rdd(cleaned_rdd, 'clean', 'lines_out')
+
+
     def _tokenize_and_lemmatize_data(self, cleaned_rdd): 
-        stop_words = set(line.strip() for line in open('stop_words.txt', 'r', encoding='UTF-8'))
+        stop_words_broadcast = cleaned_rdd.context.broadcast(self._load_stop_words())
 
-        lemmatized_rdd = cleaned_rdd.flatMap(lambda line: self._tokenize_and_lemmatize_line(line, stop_words)) \
+        lemmatized_rdd = cleaned_rdd.flatMap(lambda line: self._tokenize_and_lemmatize_line(line, stop_words_broadcast.value)) \
             .filter(lambda line: self._check_if_string_contains_any_letters(line))
         
-        return lemmatized_rdd
+        return self._count_rdd(lemmatized_rdd, 'lemmatize', 'lines_out')
+
+
+    def _parse_and_clean_dataframe(self, spark_session, input_file_path):
+        link_expression = self.link_expression.replace('\\', '\\\\')
+        link = F.regexp_replace(F.regexp_extract('match', self.link_expression, 1), '\\(.*\\)', '')
+        anchor_text = F.regexp_extract('match', self.link_expression, 2)
+        anchor_text_substring = F.regexp_extract('match', self.link_expression, 3)
+
+        # same records as _parse_line, built from spark sql functions instead of python code
+        parsed_df = spark_session.read.format('com.databricks.spark.xml') \
+            .option('rowTag', 'page') \
+            .load(input_file_path) \
+            .select(F.coalesce(F.col('revision.text._VALUE').cast('string'), F.lit('')).alias('text')) \
+            .select(F.explode(F.expr(f"regexp_extract_all(text, '{link_expression}', 0)")).alias('match')) \
+            .select(link.alias('link'), anchor_text.alias('anchor_text'), anchor_text_substring.alias('anchor_text_substring')) \
+            .select(F.when(F.col('anchor_text') != '', F.concat('link', F.lit('|'), 'anchor_text'))
+                     .when(F.col('anchor_text_substring') != '', F.concat('link', F.lit('|'), 'link', 'anchor_text_substring'))
+                     .otherwise(F.col('link')).alias('line'))
+
+        # entity decoding has no spark sql equivalent, so cleaning runs as a vectorized pandas udf
+        cleaned_df = parsed_df.select(_create_clean_udf(self.pipeline_stats)('line').alias('line')) \
+            .filter(F.col('line').rlike('[a-zA-Z]'))
+
+        return cleaned_df
+
+
+    def _tokenize_and_lemmatize_dataframe(self, spark_session, cleaned_df):
+        stop_words_broadcast = spark_session.sparkContext.broadcast(self._load_stop_words())
+
+        lemmatize_udf = _create_lemmatize_udf(stop_words_broadcast, self.pipeline_stats)
+        lemmatized_df = cleaned_df.select(F.explode(lemmatize_udf('line')).alias('line')) \
+            .filter(F.col('line').rlike('[a-zA-Z]'))
+
+        return lemmatized_df
 
     
+    def _count_lemma_pairs(self, lemmatized_rdd):
+        # one record per distinct (lemma, non-lemma) pair, lemma-only lines get an empty non-lemma
+        return lemmatized_rdd.map(lambda line: (line, 1)) \
+            .reduceByKey(operator.add) \
+            .map(_to_lemma_pair_count)
+
+
+    def _get_hadoop_path(self, spark_session, path):
+        # output paths can be on HDFS, S3 etc., so files are handled with the Hadoop FileSystem of the path
+        hadoop_path = spark_session.sparkContext._jvm.org.apache.hadoop.fs.Path(path)
+        file_system = hadoop_path.getFileSystem(spark_session.sparkContext._jsc.hadoopConfiguration())
+
+        return (file_system, hadoop_path)
+
+
+    def _delete_path(self, spark_session, path):
+        file_system, hadoop_path = self._get_hadoop_path(spark_session, path)
+        if (file_system.exists(hadoop_path)):
+            file_system.delete(hadoop_path, True)
+
+
+    def _merge_part_files(self, spark_session, part_dir_path, output_file_path):
+        # the driver streams the bytes of the part files into one file, it never holds the records
+        jvm = spark_session.sparkContext._jvm
+        file_system, part_dir = self._get_hadoop_path(spark_session, part_dir_path)
+        part_paths = sorted((status.getPath() for status in file_system.listStatus(part_dir) if (status.getPath().getName().startswith('part-'))),
+                            key=lambda part_path: part_path.getName())
+
+        output_stream = file_system.create(jvm.org.apache.hadoop.fs.Path(output_file_path), True)
+        try:
+            for part_path in part_paths:
+                input_stream = file_system.open(part_path)
+                try:
+                    jvm.org.apache.hadoop.io.IOUtils.copyBytes(input_stream, output_stream, self.merge_buffer_size, False)
+                finally:
+                    input_stream.close()
+        finally:
+            output_stream.close()
+
+        file_system.delete(part_dir, True)
+
+
     def _save_to_file(self, rdd, output_file_path):
         with open(output_file_path, 'w', encoding='UTF-8') as output_file:
             for element in rdd.collect():
                 output_file.write(element + '\n')
 
 
-    def lemmatize(self, spark_session, input_file_path, output_file_path):
+    def _save_distributed(self, spark_session, lemmatized_rdd, output_file_path, output_format, count_pairs, single_file):
+        if (output_format == 'parquet'):
+            if (count_pairs):
+                lemma_df = spark_session.createDataFrame(self._count_lemma_pairs(lemmatized_rdd), ['lemma', 'non_lemma', 'count'])
+            else:
+                lemma_df = spark_session.createDataFrame(lemmatized_rdd.map(lambda line: [line]), ['line'])
+            if (single_file):
+                lemma_df = lemma_df.repartition(1)
+            lemma_df.write.mode('overwrite').parquet(output_file_path)
+            return
+
+        if (count_pairs):
+            # same count<TAB>lemma<TAB>non-lemma lines as the pair counts of IncrementalIndex
+            lemmatized_rdd = self._count_lemma_pairs(lemmatized_rdd) \
+                .map(lambda pair_count: f'{pair_count[2]}\t{pair_count[0]}\t{pair_count[1]}')
+
+        if (single_file):
+            # executors write the parts, the driver only concatenates files and never holds the records
+            part_dir_path = output_file_path + '.parts'
+            self._delete_path(spark_session, part_dir_path)
+            lemmatized_rdd.saveAsTextFile(part_dir_path)
+            self._merge_part_files(spark_session, part_dir_path, output_file_path)
+        else:
+            self._delete_path(spark_session, output_file_path)
+            lemmatized_rdd.saveAsTextFile(output_file_path)
+
+
+    def _save_dataframe(self, spark_session, lemmatized_df, output_file_path, output_format, count_pairs, single_file):
+        if (count_pairs):
+            lemmatized_df = lemmatized_df.groupBy('line').count() \
+                .select(F.substring_index('line', '|', 1).alias('lemma'),
+                        F.when(F.instr('line', '|') > 0, F.substring_index('line', '|', -1)).otherwise(F.lit('')).alias('non_lemma'),
+                        F.col('count'))
+            if (output_format == 'text'):
+                lemmatized_df = lemmatized_df.select(F.concat_ws('\t', F.col('count').cast('string'), 'lemma', 'non_lemma').alias('line'))
+
+        if (output_format == 'parquet'):
+            if (single_file):
+                # coalesce would pull the whole upstream pipeline into one task, repartition only moves the output
+                lemmatized_df = lemmatized_df.repartition(1)
+            lemmatized_df.write.mode('overwrite').parquet(output_file_path)
+        elif (single_file):
+            part_dir_path = output_file_path + '.parts'
+            lemmatized_df.write.mode('overwrite').text(part_dir_path)
+            self._merge_part_files(spark_session, part_dir_path, output_file_path)
+        else:
+            lemmatized_df.write.mode('overwrite').text(output_file_path)
+
+
+    def lemmatize(self, spark_session, input_file_path, output_file_path, output_format='text', count_pairs=False, single_file=True, execution_mode='dataframe'):
+        if (output_format not in self.output_formats):
+            raise ValueError(f'output_format must be one of {self.output_formats}')
+        if (execution_mode not in self.execution_modes):
+            raise ValueError(f'execution_mode must be one of {self.execution_modes}')
+        
         print('Starting lemmatization process')
-
-        cleaned_rdd = self._parse_and_clean_data(spark_session, input_file_path)
-        lemmatized_rdd = self._tokenize_and_lemmatize_data(cleaned_rdd)
-        self._save_to_file(lemmatized_rdd, output_file_path)
+        for py_file in self.py_files:
+            spark_session.sparkContext.addPyFile(py_file)
+        # counters are accumulators, tasks retried by spark may count their records twice
+        self.pipeline_stats = SparkPipelineStats(spark_session.sparkContext) if (self.instrumentation_enabled) else None
+        start_time = time.perf_counter()
+
+        if (execution_mode == 'dataframe'):
+            cleaned_df = self._parse_and_clean_dataframe(spark_session, input_file_path)
+            lemmatized_df = self._tokenize_and_lemmatize_dataframe(spark_session, cleaned_df)
+            if (output_format == 'collect'):
+                self._save_to_file(lemmatized_df.rdd.map(lambda row: row.line), output_file_path)
+            else:
+                self._save_dataframe(spark_session, lemmatized_df, output_file_path, output_format, count_pairs, single_file)
+        else:
+            cleaned_rdd = self._parse_and_clean_data(spark_session, input_file_path)
+            lemmatized_rdd = self._tokenize_and_lemmatize_data(cleaned_rdd)
+            if (output_format == 'collect'):
+                self._save_to_file(lemmatized_rdd, output_file_path)
+            else:
+                self._save_distributed(spark_session, lemmatized_rdd, output_file_path, output_format, count_pairs, single_file)
+        
+        if (self.pipeline_stats is not None):
+            self.pipeline_stats.total_seconds = time.perf_counter() - start_time
         
+        # spark evaluates lazily, all stages run together while the output is saved
         print('Parsing process has finished')
         print('Cleaning process has finished')
         print('Lemmatization process has finished')
@@ -0,0 +1,113 @@
+import math
+import operator
+
+
+
+MAX_LENGTH_DIFFERENCE = 3
+MIN_PREFIX_MATCH_RATIO = 0.75
+# building first character buckets only pays off for long anchor texts
+MIN_FIRST_CHAR_BUCKET_SIZE = 8
+
+
+def calc_modified_levenshtein_distance(lemma, non_lemma, max_distance=None):
+    lemma_length = len(lemma)
+    non_lemma_length = len(non_lemma)
+    length_difference = non_lemma_length - lemma_length
+
+    if (length_difference < 0 or length_difference > MAX_LENGTH_DIFFERENCE):
+        return -1
+
+    mismatch_count = sum(map(operator.ne, lemma, non_lemma))
+
+    if ((lemma_length - mismatch_count) < MIN_PREFIX_MATCH_RATIO * lemma_length):
+        return -1
+
+    # substituting every mismatched position and appending the suffix is always
+    # a valid alignment, so this is an upper bound for the distance
+    band = mismatch_count + length_difference
+    if (band == 0):
+        return 0
+
+    if (max_distance is not None and band > max_distance):
+        if (length_difference > max_distance or max_distance == 0):
+            return max_distance + 1
+        band = max_distance
+
+    # cells outside the diagonal band can never hold a value <= band
+    out_of_band = band + 1
+    previous_row = [t2 if t2 <= band else out_of_band for t2 in range(non_lemma_length + 1)]
+    current_row = [out_of_band] * (non_lemma_length + 1)
+
+    for t1 in range(1, lemma_length + 1):
+        lo = max(1, t1 - band)
+        hi = min(non_lemma_length, t1 + band)
+        current_row[lo - 1] = t1 if (lo == 1 and t1 <= band) else out_of_band
+        row_min = current_row[lo - 1]
+        c1 = lemma[t1 - 1]
+
+        for t2 in range(lo, hi + 1):
+            if (c1 == non_lemma[t2 - 1]):
+                distance = previous_row[t2 - 1]
+            else:
+                distance = 1 + min(current_row[t2 - 1], previous_row[t2], previous_row[t2 - 1])
+            current_row[t2] = distance
+            if (distance < row_min):
+                row_min = distance
+
+        if (hi < non_lemma_length):
+            current_row[hi + 1] = out_of_band
+
+        # every path to the last cell goes through this row, without max_distance the band is an
+        # upper bound of the distance and this never happens, with it band + 1 is max_distance + 1
+        if (row_min > band):
+            return out_of_band
+
+        previous_row, current_row = current_row, previous_row
+
+    distance = previous_row[non_lemma_length]
+    if (distance > band):
+        return out_of_band
+
+    return distance
+
+
+def calc_modified_levenshtein_distances(lemma, non_lemma_list, max_distance=None):
+    return [calc_modified_levenshtein_distance(lemma, non_lemma, max_distance) for non_lemma in non_lemma_list]
+
+
+def _get_max_mismatch_count(lemma_length):
+    # the match count is an integer, so the ratio check holds exactly when it reaches the ceiling
+    return lemma_length - math.ceil(MIN_PREFIX_MATCH_RATIO * lemma_length)
+
+
+def create_first_char_buckets(non_lemma_list):
+    first_char_buckets = {}
+
+    if (len(non_lemma_list) < MIN_FIRST_CHAR_BUCKET_SIZE):
+        return None
+
+    for non_lemma in non_lemma_list:
+        if (non_lemma):
+            first_char_buckets.setdefault(non_lemma[0], []).append(non_lemma)
+
+    return first_char_buckets
+
+
+def filter_candidate_non_lemmas(lemma, non_lemma_list, max_distance=MAX_LENGTH_DIFFERENCE, first_char_buckets=None):
+    # keeps, in order, the non-lemmas whose distance to the lemma can fall in 1..max_distance,
+    # every check is a necessary condition of calc_modified_levenshtein_distance so no match is lost
+    lemma_length = len(lemma)
+    max_length = lemma_length + min(MAX_LENGTH_DIFFERENCE, max_distance)
+    max_mismatch_count = _get_max_mismatch_count(lemma_length)
+
+    if (lemma_length > 0 and max_mismatch_count == 0):
+        # short lemmas have to be a proper prefix of the non-lemma, which therefore starts with the same character
+        if (first_char_buckets is not None):
+            non_lemma_list = first_char_buckets.get(lemma[0], ())
+        return [non_lemma for non_lemma in non_lemma_list
+                if (lemma_length < len(non_lemma) <= max_length and non_lemma.startswith(lemma))]
+
+    # the distance is at least the length difference and identical words have distance 0
+    return [non_lemma for non_lemma in non_lemma_list
+            if (lemma_length <= len(non_lemma) <= max_length and non_lemma != lemma
+                and sum(map(operator.ne, lemma, non_lemma)) <= max_mismatch_count)]
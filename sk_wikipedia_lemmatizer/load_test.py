@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from corpus_generator import SyntheticWikiCorpus
+
+
+
+async def _send_request(reader, writer, host, path, body=None):
+    method = 'GET' if (body is None) else 'POST'
+    body = body or b''
+    writer.write((f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                  f'Content-Length: {len(body)}\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while (True):
+        header_line = await reader.readline()
+        if (header_line in (b'\r\n', b'')):
+            break
+        name, _, value = header_line.decode('latin-1').partition(':')
+        if (name.strip().lower() == 'content-length'):
+            content_length = int(value)
+
+    return (status, json.loads(await reader.readexactly(content_length)))
+
+
+async def _run_client(host, port, request_bodies, latency_list, error_list):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    try:
+        for body in request_bodies:
+            start_time = time.perf_counter()
+            status, response_dict = await _send_request(reader, writer, host, '/lemmatize', body)
+            latency_list.append(time.perf_counter() - start_time)
+            if (status != 200):
+                error_list.append(response_dict)
+    finally:
+        writer.close()
+
+
+def _get_percentile(sorted_values, percentile):
+    return sorted_values[min(len(sorted_values) - 1, int(percentile / 100 * len(sorted_values)))]
+
+
+async def run_load_test(host, port, request_count=10000, concurrency=32, batch_size=100, unknown_word_mode='passthrough', token_list=None, seed=0):
+    if (token_list is None):
+        corpus = SyntheticWikiCorpus(seed)
+        token_list = [word_form for _, word_forms in corpus.lemma_list for word_form in word_forms]
+
+    random_generator = random.Random(seed)
+    request_bodies = [json.dumps({'tokens': random_generator.choices(token_list, k=batch_size), 'unknown_word_mode': unknown_word_mode}).encode('UTF-8')
+                      for _ in range(request_count)]
+    latency_list = []
+    error_list = []
+
+    # every client keeps one connection open and sends its share of the requests one after another
+    start_time = time.perf_counter()
+    await asyncio.gather(*[_run_client(host, port, request_bodies[idx::concurrency], latency_list, error_list) for idx in range(concurrency)])
+    elapsed_time = time.perf_counter() - start_time
+
+    latency_list.sort()
+    results = {
+        'requests': request_count,
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'errors': len(error_list),
+        'seconds': elapsed_time,
+        'requests_per_second': request_count / elapsed_time,
+        'tokens_per_second': request_count * batch_size / elapsed_time,
+        'latency_ms': {f'p{percentile}': 1000 * _get_percentile(latency_list, percentile) for percentile in (50, 90, 99)}
+    }
+    results['latency_ms']['max'] = 1000 * latency_list[-1]
+
+    print(f"{results['requests_per_second']:,.0f} requests/s  {results['tokens_per_second']:,.0f} tokens/s  errors: {results['errors']}")
+    print('latency ' + '  '.join(f'{name}: {value:.2f} ms' for name, value in results['latency_ms'].items()))
+
+    return results
+
+
+async def _wait_for_service(host, port, timeout=30):
+    deadline = time.perf_counter() + timeout
+
+    while (True):
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            status, _ = await _send_request(reader, writer, host, '/health')
+            writer.close()
+            if (status == 200):
+                return
+        except OSError:
+            if (time.perf_counter() > deadline):
+                raise
+        await asyncio.sleep(0.1)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latency and throughput load test of the lemmatizer service on localhost')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--index', help='start the service with this index for the duration of the test')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--unknown-word-mode', default='passthrough')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    service_process = None
+    if (args.index):
+        service_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'service.py')
+        service_command = [sys.executable, service_file_path, args.index, '--host', args.host, '--port', str(args.port)]
+        if (args.workers):
+            service_command += ['--workers', str(args.workers)]
+        service_process = subprocess.Popen(service_command)
+
+    try:
+        asyncio.run(_wait_for_service(args.host, args.port))
+        results = asyncio.run(run_load_test(args.host, args.port, args.requests, args.concurrency, args.batch_size, args.unknown_word_mode))
+    finally:
+        if (service_process is not None):
+            service_process.terminate()
+            service_process.wait()
+
+    if (args.output):
+        with open(args.output, 'w', encoding='UTF-8') as output_file:
+            json.dump(results, output_file, indent=2)
@@ -0,0 +1,65 @@
+import re
+import html
+
+
+
+SLOVAK_LETTERS = 'a-zA-ZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ'
+SLOVAK_LETTER_SET = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZáäčďéíĺľňóôŕšťúýžÁÄČĎÉÍĹĽŇÓÔŔŠŤÚÝŽ'
+)
+
+LINK_PATTERN = re.compile(f'\\[\\[([^|\\]]+)\\|?([^|\\]]+)?\\]\\]([{SLOVAK_LETTERS}]+)?')
+DISAMBIGUATION_PATTERN = re.compile('\\(.*\\)')
+NON_LETTER_PATTERN = re.compile(f'[^{SLOVAK_LETTERS}|]+')
+ASCII_LETTER_PATTERN = re.compile('[a-zA-Z]')
+
+
+
+class _NonLetterTranslationTable(dict):
+
+    # maps every character except Slovak letters and the separator to a space,
+    # the table is filled lazily because the complement is the whole of unicode
+    def __missing__(self, code_point):
+        character = chr(code_point)
+        if (character not in SLOVAK_LETTER_SET and character != '|'):
+            character = ' '
+        self[code_point] = character
+        return character
+
+
+
+NON_LETTER_TRANSLATION_TABLE = _NonLetterTranslationTable()
+
+
+def find_links(line):
+    return LINK_PATTERN.findall(line)
+
+
+def contains_link(line):
+    return LINK_PATTERN.search(line) is not None
+
+
+def remove_disambiguation(link):
+    if ('(' not in link):
+        return link
+    return DISAMBIGUATION_PATTERN.sub('', link)
+
+
+def unescape_entities(line):
+    # html.unescape and the replacements below are no-ops for lines without an entity
+    if ('&' not in line):
+        return line
+    line = html.unescape(line)
+    return line.replace('&nbsp;', ' ').replace('&amp;', ' ')
+
+
+def replace_non_letters(line):
+    return ' '.join(line.translate(NON_LETTER_TRANSLATION_TABLE).split())
+
+
+def normalize_line(line):
+    return replace_non_letters(unescape_entities(line))
+
+
+def contains_ascii_letters(string):
+    return bool(string) and ASCII_LETTER_PATTERN.search(string) is not None
@@ -0,0 +1,100 @@
+import os
+import array
+import heapq
+import tempfile
+import itertools
+
+
+
+class PairCounter:
+
+    # strings are interned to integer ids and a pair is counted under one packed 64-bit key,
+    # sorted runs are spilled to disk whenever the in-memory counter reaches the budget,
+    # only the pair counts are bounded, the string table of all distinct keys and values
+    # stays in memory, so memory still grows with the vocabulary of the input
+    spill_block_size = 64 * 1024
+
+
+    def __init__(self, max_pairs_in_memory=5 * 1000 * 1000):
+        self.max_pairs_in_memory = max_pairs_in_memory
+        self.string_id_dict = {}
+        self.string_list = []
+        self._pair_count_dict = {}
+        self._spill_dir = None
+        self._run_file_paths = []
+
+
+    def _get_string_id(self, string):
+        string_id = self.string_id_dict.get(string)
+
+        if (string_id is None):
+            string_id = len(self.string_list)
+            self.string_id_dict[string] = string_id
+            self.string_list.append(string)
+
+        return string_id
+
+
+    def add(self, key, value, count=1):
+        pair_key = (self._get_string_id(key) << 32) | self._get_string_id(value)
+        self._pair_count_dict[pair_key] = self._pair_count_dict.get(pair_key, 0) + count
+
+        if (len(self._pair_count_dict) >= self.max_pairs_in_memory):
+            self._spill()
+
+
+    def _spill(self):
+        if (self._spill_dir is None):
+            self._spill_dir = tempfile.TemporaryDirectory(prefix='pair_counter_')
+
+        run = array.array('Q')
+        for pair_key in sorted(self._pair_count_dict):
+            run.append(pair_key)
+            run.append(self._pair_count_dict[pair_key])
+
+        run_file_path = os.path.join(self._spill_dir.name, f'run-{len(self._run_file_paths):05d}.bin')
+        with open(run_file_path, 'wb') as run_file:
+            run.tofile(run_file)
+
+        self._run_file_paths.append(run_file_path)
+        self._pair_count_dict = {}
+
+
+    def _read_run(self, run_file_path):
+        with open(run_file_path, 'rb') as run_file:
+            while (True):
+                block = array.array('Q')
+                try:
+                    block.fromfile(run_file, 2 * self.spill_block_size)
+                except EOFError:
+                    # fromfile keeps the items it could read before the end of the file
+                    pass
+
+                for idx in range(0, len(block), 2):
+                    yield (block[idx], block[idx + 1])
+
+                if (len(block) < 2 * self.spill_block_size):
+                    break
+
+
+    def iter_grouped_counts(self):
+        runs = [self._read_run(run_file_path) for run_file_path in self._run_file_paths]
+        runs.append(sorted(self._pair_count_dict.items()))
+        merged_pair_counts = heapq.merge(*runs)
+
+        # equal pair keys from different runs are next to each other after the merge
+        for key_id, key_pair_counts in itertools.groupby(merged_pair_counts, key=lambda pair_count: pair_count[0] >> 32):
+            value_count_dict = {}
+            for pair_key, count in key_pair_counts:
+                value = self.string_list[pair_key & 0xFFFFFFFF]
+                value_count_dict[value] = value_count_dict.get(value, 0) + count
+
+            yield (self.string_list[key_id], value_count_dict)
+
+
+    def close(self):
+        if (self._spill_dir is not None):
+            self._spill_dir.cleanup()
+            self._spill_dir = None
+        self._run_file_paths = []
+        self._pair_count_dict = {}
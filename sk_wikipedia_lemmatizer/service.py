@@ -0,0 +1,280 @@
+import json
+import signal
+import socket
+import asyncio
+import argparse
+import multiprocessing
+import concurrent.futures
+from index import IndexNonLemma
+
+
+
+HTTP_STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+
+class LemmatizerService:
+
+    max_body_size = 16 * 1024 * 1024
+    # requests that arrive within batch_wait_seconds are lemmatized together, up to max_batch_size tokens
+    max_batch_size = 10000
+    batch_wait_seconds = 0.002
+
+
+    def __init__(self, index_file_path, cache_size=None):
+        self.index = IndexNonLemma()
+        if (cache_size is not None):
+            self.index.lemmatize_cache_size = cache_size
+        # the index is memory mapped, so all workers share the pages of the file instead of holding a copy each
+        self.index.load_index(index_file_path)
+
+        # lookups run outside the event loop, so a slow fuzzy batch does not stall the other connections,
+        # one thread, so the index and its cache are only used by one thread
+        self.lookup_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.batch_task_set = set()
+
+        self.pending_request_list = []
+        self.pending_token_count = 0
+        self.flush_handle = None
+        self.stats_dict = {'requests': 0, 'batches': 0, 'tokens': 0}
+
+
+    def _parse_request(self, body):
+        try:
+            request_dict = json.loads(body)
+        except ValueError:
+            raise HttpError(400, 'request body is not valid JSON')
+
+        if (not isinstance(request_dict, dict)):
+            raise HttpError(400, 'request body must be a JSON object')
+
+        unknown_word_mode = request_dict.get('unknown_word_mode', 'passthrough')
+        if (unknown_word_mode not in self.index.unknown_word_modes):
+            raise HttpError(400, f'unknown_word_mode must be one of {self.index.unknown_word_modes}')
+
+        # tokens are lemmatized as they are, documents are split on whitespace first
+        if (isinstance(request_dict.get('tokens'), list)):
+            token_lists = [request_dict['tokens']]
+            is_document_request = False
+        elif (isinstance(request_dict.get('documents'), list)):
+            token_lists = [document.split() if (isinstance(document, str)) else document for document in request_dict['documents']]
+            is_document_request = True
+        else:
+            raise HttpError(400, 'request must contain a list of tokens or documents')
+
+        for token_list in token_lists:
+            if (not isinstance(token_list, list) or not all(isinstance(token, str) for token in token_list)):
+                raise HttpError(400, 'tokens and documents must be strings')
+
+        return (token_lists, unknown_word_mode, is_document_request)
+
+
+    def _flush(self):
+        pending_request_list = self.pending_request_list
+        self.pending_request_list = []
+        self.pending_token_count = 0
+        if (self.flush_handle is not None):
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        mode_request_dict = {}
+        for pending_request in pending_request_list:
+            mode_request_dict.setdefault(pending_request[1], []).append(pending_request)
+
+        # one lookup per unknown word mode, the tasks are referenced until they finish
+        for unknown_word_mode, mode_request_list in mode_request_dict.items():
+            batch_task = asyncio.get_running_loop().create_task(self._lemmatize_batch(unknown_word_mode, mode_request_list))
+            self.batch_task_set.add(batch_task)
+            batch_task.add_done_callback(self.batch_task_set.discard)
+
+
+    async def _lemmatize_batch(self, unknown_word_mode, mode_request_list):
+        # duplicate tokens of all requests in the batch are looked up once
+        token_list = [token for token_lists, _, future in mode_request_list for token_list in token_lists for token in token_list]
+        try:
+            lemma_list = await asyncio.get_running_loop().run_in_executor(self.lookup_executor, self.index.lemmatize_tokens, token_list, unknown_word_mode)
+        except Exception as error:
+            for _, _, future in mode_request_list:
+                if (not future.done()):
+                    future.set_exception(error)
+            return
+        self.stats_dict['batches'] += 1
+        self.stats_dict['tokens'] += len(token_list)
+
+        offset = 0
+        for token_lists, _, future in mode_request_list:
+            lemma_lists = []
+            for token_list in token_lists:
+                lemma_lists.append(lemma_list[offset:offset + len(token_list)])
+                offset += len(token_list)
+            if (not future.done()):
+                future.set_result(lemma_lists)
+
+
+    def lemmatize(self, token_lists, unknown_word_mode):
+        future = asyncio.get_running_loop().create_future()
+        self.pending_request_list.append((token_lists, unknown_word_mode, future))
+        self.pending_token_count += sum(len(token_list) for token_list in token_lists)
+
+        if (self.pending_token_count >= self.max_batch_size):
+            self._flush()
+        elif (self.flush_handle is None):
+            self.flush_handle = asyncio.get_running_loop().call_later(self.batch_wait_seconds, self._flush)
+
+        return future
+
+
+    async def _handle_request(self, method, path, body):
+        if (path == '/health'):
+            cache_info = self.index._lemmatize_token_cached.cache_info()
+            return {'status': 'ok', 'index_size': len(self.index.index_dict), 'cache_hits': cache_info.hits,
+                    'cache_misses': cache_info.misses, **self.stats_dict}
+        elif (path != '/lemmatize'):
+            raise HttpError(404, f'{path} not found')
+        elif (method != 'POST'):
+            raise HttpError(405, 'use POST for /lemmatize')
+
+        token_lists, unknown_word_mode, is_document_request = self._parse_request(body)
+        self.stats_dict['requests'] += 1
+        lemma_lists = await self.lemmatize(token_lists, unknown_word_mode)
+
+        return {'lemmas': lemma_lists if (is_document_request) else lemma_lists[0]}
+
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if (not request_line):
+            return None
+
+        try:
+            method, path, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, 'invalid request line')
+
+        header_dict = {}
+        while (True):
+            header_line = await reader.readline()
+            if (header_line in (b'\r\n', b'\n', b'')):
+                break
+            name, _, value = header_line.decode('latin-1').partition(':')
+            header_dict[name.strip().lower()] = value.strip()
+
+        try:
+            content_length = int(header_dict.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, 'invalid Content-Length header')
+        if (content_length > self.max_body_size):
+            raise HttpError(413, f'request body is larger than {self.max_body_size} bytes')
+        body = await reader.readexactly(content_length) if (content_length > 0) else b''
+
+        keep_alive = (version == 'HTTP/1.1' and header_dict.get('connection', '').lower() != 'close')
+
+        return (method, path.split('?', 1)[0], body, keep_alive)
+
+
+    def _write_response(self, writer, status, response_dict, keep_alive):
+        body = json.dumps(response_dict, ensure_ascii=False).encode('UTF-8')
+        header = (f'HTTP/1.1 {status} {HTTP_STATUS_REASONS[status]}\r\n'
+                  f'Content-Type: application/json; charset=utf-8\r\n'
+                  f'Content-Length: {len(body)}\r\n'
+                  f'Connection: {"keep-alive" if (keep_alive) else "close"}\r\n\r\n')
+        writer.write(header.encode('latin-1') + body)
+
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while (True):
+                try:
+                    request = await self._read_request(reader)
+                    if (request is None):
+                        break
+                    method, path, body, keep_alive = request
+                    status, response_dict = 200, await self._handle_request(method, path, body)
+                except HttpError as error:
+                    # the rest of a bad request can not be trusted, the connection is closed after the error
+                    status, response_dict, keep_alive = error.status, {'error': str(error)}, False
+                except (asyncio.IncompleteReadError, ConnectionResetError):
+                    raise
+                except Exception as error:
+                    status, response_dict, keep_alive = 500, {'error': repr(error)}, False
+
+                self._write_response(writer, status, response_dict, keep_alive)
+                await writer.drain()
+                if (not keep_alive):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def serve(self, listening_socket):
+        server = await asyncio.start_server(self._handle_connection, sock=listening_socket)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.lookup_executor.shutdown(wait=False)
+
+
+
+def _run_worker(index_file_path, listening_socket, cache_size):
+    service = LemmatizerService(index_file_path, cache_size)
+
+    try:
+        asyncio.run(service.serve(listening_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+def _raise_keyboard_interrupt(signal_number, frame):
+    raise KeyboardInterrupt()
+
+
+def run_server(index_file_path, host='127.0.0.1', port=8080, workers=None, cache_size=None):
+    # SIGTERM stops the service like Ctrl+C, so the workers are not left running without the parent
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+
+    # the workers accept connections from one shared listening socket
+    listening_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listening_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listening_socket.bind((host, port))
+    listening_socket.listen(1024)
+
+    worker_list = [multiprocessing.Process(target=_run_worker, args=(index_file_path, listening_socket, cache_size), daemon=True)
+                   for _ in range(workers or multiprocessing.cpu_count())]
+    for worker in worker_list:
+        worker.start()
+    print(f'Lemmatizer service with {len(worker_list)} workers is listening on http://{host}:{port}')
+
+    try:
+        for worker in worker_list:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in worker_list:
+            worker.terminate()
+        for worker in worker_list:
+            worker.join()
+    finally:
+        listening_socket.close()
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local HTTP service that lemmatizes tokens with an IndexNonLemma index')
+    parser.add_argument('index_file_path')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-size', type=int, default=None)
+    args = parser.parse_args()
+
+    run_server(args.index_file_path, args.host, args.port, args.workers, args.cache_size)
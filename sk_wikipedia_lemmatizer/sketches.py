@@ -0,0 +1,80 @@
+import math
+import numpy as np
+import pandas as pd
+
+
+
+def hash_strings(strings):
+    # 64-bit hashes of a string array, stable across processes and runs
+    return pd.util.hash_array(np.asarray(strings, dtype=object))
+
+
+def _calc_bit_lengths(values):
+    bit_lengths = np.zeros(len(values), dtype=np.uint64)
+
+    for shift in (32, 16, 8, 4, 2, 1):
+        is_longer = (values >> np.uint64(shift)) != 0
+        bit_lengths += is_longer.astype(np.uint64) * np.uint64(shift)
+        values = np.where(is_longer, values >> np.uint64(shift), values)
+
+    return bit_lengths + (values != 0).astype(np.uint64)
+
+
+
+class CountMinSketch:
+
+    # the estimate of an item is never below its true count and exceeds it by at most
+    # e / width * total count with probability 1 - exp(-depth)
+    def __init__(self, width=2 ** 18, depth=4, seed=0):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+        random_generator = np.random.RandomState(seed)
+        # multiply-shift hashing of the 64-bit string hashes, one odd multiplier per row
+        self.multipliers = random_generator.randint(1, 2 ** 62, size=depth, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+    def _get_columns(self, hashes):
+        with np.errstate(over='ignore'):
+            return [((hashes * multiplier) >> np.uint64(32)) % np.uint64(self.width) for multiplier in self.multipliers]
+
+
+    def add(self, hashes, counts):
+        for row, columns in enumerate(self._get_columns(hashes)):
+            np.add.at(self.table[row], columns.astype(np.int64), counts)
+
+
+    def estimate(self, hashes):
+        return np.min([self.table[row][columns.astype(np.int64)] for row, columns in enumerate(self._get_columns(hashes))], axis=0)
+
+
+
+class HyperLogLog:
+
+    # the relative standard error of the estimate is about 1.04 / sqrt(2 ** precision)
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.register_count = 2 ** precision
+        self.registers = np.zeros(self.register_count, dtype=np.uint8)
+
+
+    def add(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        register_ids = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remaining_bits = hashes & np.uint64(2 ** (64 - self.precision) - 1)
+        # position of the leftmost 1 bit in the remaining bits
+        ranks = (np.uint64(64 - self.precision) - _calc_bit_lengths(remaining_bits) + np.uint64(1)).astype(np.uint8)
+        np.maximum.at(self.registers, register_ids, ranks)
+
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.register_count)
+        estimate = alpha * self.register_count ** 2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zero_register_count = int(np.count_nonzero(self.registers == 0))
+
+        # linear counting is more accurate for small cardinalities
+        if (estimate <= 2.5 * self.register_count and zero_register_count > 0):
+            estimate = self.register_count * math.log(self.register_count / zero_register_count)
+
+        return int(round(estimate))
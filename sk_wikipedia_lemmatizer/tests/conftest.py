@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+# the lemmatizer modules import each other by module name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,91 @@
+import os
+import pytest
+from index import IndexLemma, IndexNonLemma, IncrementalIndex
+
+
+def _write_lines(file_path, line_list):
+    with open(file_path, 'w', encoding='UTF-8') as output_file:
+        output_file.writelines(f'{line}\n' for line in line_list)
+
+    return str(file_path)
+
+
+def test_fuzzy_lookup_uses_rebuilt_index(tmp_path):
+    index_non_lemma = IndexNonLemma()
+    index_non_lemma.create_index(_write_lines(tmp_path / 'first.txt', ['pes|psa', 'pes|psovi']))
+    assert index_non_lemma.lemmatize_tokens(['mestu'], 'fuzzy') == [None]
+
+    # the fuzzy index created by the lookup above only knows the lemmas of the first file
+    index_non_lemma.create_index(_write_lines(tmp_path / 'second.txt', ['mesto|mesta', 'mesto|mestom']))
+    assert index_non_lemma.lemmatize_tokens(['mestu'], 'fuzzy') == ['mesto']
+
+
+def test_rebuild_keeps_given_fuzzy_index(tmp_path):
+    index_lemma = IndexLemma()
+    index_lemma.create_index(_write_lines(tmp_path / 'lemmas.txt', ['mesto|mesta']))
+    fuzzy_index = index_lemma.create_fuzzy_index()
+
+    index_non_lemma = IndexNonLemma(fuzzy_index)
+    index_non_lemma.create_index(_write_lines(tmp_path / 'non_lemmas.txt', ['pes|psa']))
+
+    assert index_non_lemma.fuzzy_index is fuzzy_index
+    assert index_non_lemma.lemmatize_tokens(['mestu', 'psa'], 'fuzzy') == ['mesto', 'pes']
+
+
+def test_alternatives_survive_save_and_load(tmp_path):
+    index_non_lemma = IndexNonLemma(top_k=2)
+    index_non_lemma.create_index(_write_lines(tmp_path / 'pairs.txt', ['pes|psa', 'pes|psa', 'peso|psa', 'psa|psa', 'pes|psovi']))
+    index_file_path = str(tmp_path / 'index_non_lemma.idx')
+    index_non_lemma.save_index(index_file_path)
+
+    loaded_index = IndexNonLemma()
+    loaded_index.load_index(index_file_path)
+
+    assert loaded_index.lookup_alternatives('psa') == [('pes', 0.5), ('peso', 0.25)]
+    assert loaded_index.lookup_alternatives('Psovi') == [('pes', 1.0)]
+    assert loaded_index.lemmatize_tokens(['psa']) == ['pes']
+
+
+def test_incremental_index_keeps_saved_version_after_failed_apply(tmp_path, monkeypatch):
+    index_dir = str(tmp_path / 'index')
+    incremental_index = IncrementalIndex(index_dir)
+    incremental_index.create_index(_write_lines(tmp_path / 'first.txt', ['pes|psa', 'mesto|mesta']))
+    pair_count_dict = dict(incremental_index.pair_count_dict)
+    file_names = sorted(os.listdir(index_dir))
+
+    def fail_manifest_write(file_name, write_function):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(incremental_index, '_write_atomically', fail_manifest_write)
+    with pytest.raises(OSError):
+        incremental_index.apply_dump('second', added_file_path=_write_lines(tmp_path / 'second.txt', ['pes|psovi']))
+
+    assert incremental_index.pair_count_dict == pair_count_dict
+    assert 'second' not in incremental_index.manifest_dict['applied_dumps']
+    assert IncrementalIndex(index_dir).pair_count_dict == pair_count_dict
+    assert IncrementalIndex(index_dir).load_index_non_lemma().lemmatize_tokens(['psovi'], 'none') == [None]
+
+    monkeypatch.undo()
+    assert incremental_index.apply_dump('second', added_file_path=str(tmp_path / 'second.txt'))
+    assert IncrementalIndex(index_dir).load_index_non_lemma().lemmatize_tokens(['psovi'], 'none') == ['pes']
+    assert len(os.listdir(index_dir)) == len(file_names)
+
+
+def test_incremental_index_recreate_removes_previous_version(tmp_path):
+    index_dir = str(tmp_path / 'index')
+    incremental_index = IncrementalIndex(index_dir, top_k=2)
+    incremental_index.create_index(_write_lines(tmp_path / 'first.txt', ['pes|psa']))
+    incremental_index.create_index(_write_lines(tmp_path / 'second.txt', ['mesto|mesta']))
+
+    assert sorted(os.listdir(index_dir)) == ['index_lemma.2.idx', 'index_non_lemma.2.idx', 'index_non_lemma.2.idx.alt', 
+                                             'index_non_lemma.2.idx.fuzzy', 'manifest.json', 'pair_counts.2.tsv']
+    assert dict(IncrementalIndex(index_dir).load_index_lemma().index_dict.items()) == {'mesto': {'mesta'}}
+
+
+def test_incremental_index_rejects_single_index_methods(tmp_path):
+    incremental_index = IncrementalIndex(str(tmp_path / 'index'))
+
+    with pytest.raises(NotImplementedError):
+        incremental_index.save_index(str(tmp_path / 'index.idx'))
+    with pytest.raises(NotImplementedError):
+        incremental_index.load_index(str(tmp_path / 'index.idx'))
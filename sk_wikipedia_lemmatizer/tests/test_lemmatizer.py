@@ -0,0 +1,41 @@
+import os
+import glob
+import pytest
+
+pytest.importorskip('pyspark')
+from corpus_generator import SyntheticWikiCorpus
+from lemma_pair_storage import calc_file_hash
+from lemmatizer import WikiLemmatizer, MultiprocessWikiLemmatizer
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _read_lines(file_path):
+    with open(file_path, 'r', encoding='UTF-8') as input_file:
+        return input_file.read().splitlines()
+
+
+def test_restart_with_fewer_processes_removes_stale_chunks(tmp_path, monkeypatch):
+    monkeypatch.chdir(PACKAGE_DIR)
+    dump_file_path = str(tmp_path / 'skwiki.xml')
+    SyntheticWikiCorpus(seed=16).write_dump(dump_file_path, 80)
+
+    expected_file_path = str(tmp_path / 'expected.csv')
+    WikiLemmatizer().lemmatize(dump_file_path, expected_file_path)
+
+    # the chunks of an interrupted run with 4 processes, finished but not merged
+    output_file_path = str(tmp_path / 'lemmatized.csv')
+    lemmatizer = MultiprocessWikiLemmatizer(processes=4)
+    lemmatizer.enable_checkpointing(100)
+    lemmatizer.input_hash = calc_file_hash(dump_file_path)
+    chunk_boundaries = lemmatizer._get_chunk_boundaries(dump_file_path, lemmatizer.processes * lemmatizer.chunks_per_process)
+    for idx, (start, end) in enumerate(chunk_boundaries):
+        lemmatizer._lemmatize_chunk(dump_file_path, start, end, f'{output_file_path}.part-{idx:05d}')
+
+    lemmatizer = MultiprocessWikiLemmatizer(processes=2)
+    lemmatizer.enable_checkpointing(100)
+    lemmatizer.lemmatize(dump_file_path, output_file_path)
+
+    assert _read_lines(output_file_path) == _read_lines(expected_file_path)
+    assert glob.glob(output_file_path + '.part-*') == []
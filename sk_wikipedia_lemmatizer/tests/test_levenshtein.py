@@ -0,0 +1,104 @@
+import random
+import numpy as np
+import pytest
+from levenshtein import calc_modified_levenshtein_distance, calc_modified_levenshtein_distances
+
+
+SLOVAK_ALPHABET = 'aáäbcčdďeéfghiíjklĺľmnňoóôpqrŕsštťuúvwxyýzž'
+PAIR_COUNT = 20000
+
+
+def calc_reference_distance(lemma, non_lemma):
+    # the NumPy matrix implementation that WikiLemmatizer used before the banded version
+    if (len(lemma) > len(non_lemma) or abs(len(lemma) - len(non_lemma)) > 3):
+        return -1
+
+    prefix_match_count = 0
+    for idx, c in enumerate(lemma):
+        if (lemma[idx] == non_lemma[idx]):
+            prefix_match_count += 1
+
+    if (prefix_match_count < 0.75 * len(lemma)):
+        return -1
+
+    distances = np.zeros((len(lemma) + 1, len(non_lemma) + 1))
+
+    for t1 in range(len(lemma) + 1):
+        distances[t1][0] = t1
+    for t2 in range(len(non_lemma) + 1):
+        distances[0][t2] = t2
+
+    for t1 in range(1, len(lemma) + 1):
+        for t2 in range(1, len(non_lemma) + 1):
+            if (lemma[t1 - 1] == non_lemma[t2 - 1]):
+                distances[t1][t2] = distances[t1 - 1][t2 - 1]
+            else:
+                a = distances[t1][t2 - 1]
+                b = distances[t1 - 1][t2]
+                c = distances[t1 - 1][t2 - 1]
+                distances[t1][t2] = 1 + min(a, b, c)
+
+    return int(distances[len(lemma)][len(non_lemma)])
+
+
+def _create_word(random_generator, length):
+    return ''.join(random_generator.choice(SLOVAK_ALPHABET) for _ in range(length))
+
+
+def _create_word_pairs(seed, pair_count):
+    # mostly inflection-like edits of the lemma, so many pairs pass the length and prefix checks
+    random_generator = random.Random(seed)
+    word_pair_list = []
+
+    for _ in range(pair_count):
+        lemma = _create_word(random_generator, random_generator.randint(0, 12))
+        non_lemma = list(lemma)
+
+        if (random_generator.random() < 0.2):
+            non_lemma = list(_create_word(random_generator, random_generator.randint(0, 14)))
+        else:
+            for _ in range(random_generator.randint(0, 4)):
+                edit = random_generator.choice(('substitute', 'insert', 'delete', 'append'))
+                position = random_generator.randint(0, len(non_lemma))
+                if (edit == 'substitute' and position < len(non_lemma)):
+                    non_lemma[position] = random_generator.choice(SLOVAK_ALPHABET)
+                elif (edit == 'insert'):
+                    non_lemma.insert(position, random_generator.choice(SLOVAK_ALPHABET))
+                elif (edit == 'delete' and position < len(non_lemma)):
+                    del non_lemma[position]
+                else:
+                    non_lemma.append(random_generator.choice(SLOVAK_ALPHABET))
+
+        word_pair_list.append((lemma, ''.join(non_lemma)))
+
+    return word_pair_list
+
+
+@pytest.fixture(scope='module', params=[0, 1, 2])
+def word_pair_list(request):
+    return _create_word_pairs(request.param, PAIR_COUNT)
+
+
+def test_distance_matches_reference(word_pair_list):
+    for lemma, non_lemma in word_pair_list:
+        assert calc_modified_levenshtein_distance(lemma, non_lemma) == calc_reference_distance(lemma, non_lemma), (lemma, non_lemma)
+
+
+@pytest.mark.parametrize('max_distance', [0, 1, 3])
+def test_bounded_distance_matches_reference(word_pair_list, max_distance):
+    # distances above max_distance are reported as max_distance + 1
+    for lemma, non_lemma in word_pair_list:
+        distance = calc_reference_distance(lemma, non_lemma)
+        expected_distance = distance if (distance <= max_distance) else max_distance + 1
+        assert calc_modified_levenshtein_distance(lemma, non_lemma, max_distance) == expected_distance, (lemma, non_lemma)
+
+
+def test_batched_distances_match_reference(word_pair_list):
+    random_generator = random.Random(len(word_pair_list))
+    non_lemma_list = [non_lemma for _, non_lemma in word_pair_list]
+
+    for lemma, _ in word_pair_list[:200]:
+        anchor_text_list = random_generator.sample(non_lemma_list, 50)
+        expected_distances = [calc_reference_distance(lemma, non_lemma) for non_lemma in anchor_text_list]
+        assert calc_modified_levenshtein_distances(lemma, anchor_text_list) == expected_distances
+        assert calc_modified_levenshtein_distances(lemma, anchor_text_list, 3) == [distance if (distance <= 3) else 4 for distance in expected_distances]
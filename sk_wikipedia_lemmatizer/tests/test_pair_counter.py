@@ -0,0 +1,31 @@
+import random
+from pair_counter import PairCounter
+
+
+def _count_pairs(pair_list, max_pairs_in_memory):
+    pair_counter = PairCounter(max_pairs_in_memory)
+
+    try:
+        for key, value, count in pair_list:
+            pair_counter.add(key, value, count)
+
+        spilled_run_count = len(pair_counter._run_file_paths)
+        grouped_count_dict = dict(pair_counter.iter_grouped_counts())
+    finally:
+        pair_counter.close()
+
+    return (grouped_count_dict, spilled_run_count)
+
+
+def test_spilled_counts_match_in_memory_counts():
+    random_generator = random.Random(5)
+    pair_list = [(f'key{random_generator.randint(0, 300)}', f'value{random_generator.randint(0, 20)}', random_generator.randint(1, 3)) 
+                 for _ in range(20000)]
+
+    expected_count_dict, expected_run_count = _count_pairs(pair_list, len(pair_list) + 1)
+    grouped_count_dict, spilled_run_count = _count_pairs(pair_list, 100)
+
+    assert expected_run_count == 0
+    assert spilled_run_count > 10
+    assert grouped_count_dict == expected_count_dict
+    assert sum(sum(value_count_dict.values()) for value_count_dict in grouped_count_dict.values()) == sum(count for _, _, count in pair_list)
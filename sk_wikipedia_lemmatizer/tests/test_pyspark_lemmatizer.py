@@ -0,0 +1,94 @@
+import os
+import glob
+import shutil
+import pytest
+
+pytest.importorskip('pyspark')
+if (not os.environ.get('JAVA_HOME') and shutil.which('java') is None):
+    pytest.skip('Spark needs a Java runtime', allow_module_level=True)
+
+from pyspark.sql import SparkSession
+from corpus_generator import SyntheticWikiCorpus
+from lemmatizer import WikiLemmatizer, PysparkWikiLemmatizer
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def spark_session():
+    spark_session = SparkSession.builder \
+        .master('local[*]') \
+        .appName('test_pyspark_lemmatizer') \
+        .config('spark.ui.enabled', 'false') \
+        .getOrCreate()
+    yield spark_session
+    spark_session.stop()
+
+
+@pytest.fixture(scope='module')
+def dump_file_path(tmp_path_factory):
+    dump_file_path = str(tmp_path_factory.mktemp('dump') / 'skwiki.xml')
+    SyntheticWikiCorpus(seed=12).write_dump(dump_file_path, 60)
+
+    return dump_file_path
+
+
+@pytest.fixture(scope='module')
+def expected_lines(dump_file_path, tmp_path_factory):
+    # stop_words.txt and the py_files are read relative to the working directory
+    working_dir = os.getcwd()
+    os.chdir(PACKAGE_DIR)
+    try:
+        output_file_path = str(tmp_path_factory.mktemp('expected') / 'lemmatized.csv')
+        WikiLemmatizer().lemmatize(dump_file_path, output_file_path)
+    finally:
+        os.chdir(working_dir)
+
+    with open(output_file_path, 'r', encoding='UTF-8') as output_file:
+        return sorted(output_file.read().splitlines())
+
+
+def _read_output_lines(output_file_path):
+    # without single_file the output is a directory of part files
+    output_file_paths = sorted(glob.glob(os.path.join(output_file_path, 'part-*'))) if (os.path.isdir(output_file_path)) else [output_file_path]
+    line_list = []
+
+    for file_path in output_file_paths:
+        with open(file_path, 'r', encoding='UTF-8') as output_file:
+            line_list.extend(output_file.read().splitlines())
+
+    return sorted(line_list)
+
+
+@pytest.mark.parametrize('execution_mode', PysparkWikiLemmatizer.execution_modes)
+@pytest.mark.parametrize('single_file', [True, False])
+def test_output_matches_wiki_lemmatizer(spark_session, dump_file_path, expected_lines, tmp_path, monkeypatch, execution_mode, single_file):
+    monkeypatch.chdir(PACKAGE_DIR)
+    output_file_path = str(tmp_path / 'lemmatized.csv')
+
+    PysparkWikiLemmatizer().lemmatize(spark_session, dump_file_path, output_file_path, single_file=single_file, execution_mode=execution_mode)
+
+    assert expected_lines
+    assert _read_output_lines(output_file_path) == expected_lines
+    assert not os.path.exists(output_file_path + '.parts')
+
+
+@pytest.mark.parametrize('execution_mode', PysparkWikiLemmatizer.execution_modes)
+def test_counted_output_matches_wiki_lemmatizer(spark_session, dump_file_path, expected_lines, tmp_path, monkeypatch, execution_mode):
+    monkeypatch.chdir(PACKAGE_DIR)
+    output_file_path = str(tmp_path / 'lemma_pairs.tsv')
+
+    PysparkWikiLemmatizer().lemmatize(spark_session, dump_file_path, output_file_path, count_pairs=True, execution_mode=execution_mode)
+
+    expected_count_dict = {}
+    for line in expected_lines:
+        lemma, _, non_lemma = line.partition('|')
+        expected_count_dict[(lemma, non_lemma)] = expected_count_dict.get((lemma, non_lemma), 0) + 1
+
+    count_dict = {}
+    for line in _read_output_lines(output_file_path):
+        count, lemma, non_lemma = line.split('\t')
+        count_dict[(lemma, non_lemma)] = int(count)
+
+    assert count_dict == expected_count_dict
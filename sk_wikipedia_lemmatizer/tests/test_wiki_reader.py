@@ -0,0 +1,64 @@
+import os
+import bz2
+import pytest
+from xml.sax.saxutils import escape
+from wiki_reader import read_page_lines
+
+pytest.importorskip('pyspark')
+from lemmatizer import WikiLemmatizer
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# entities in the wikitext are escaped once more in the XML of the dump
+PAGE_TEXT = '''Mesto [[Bratislava|Bratislavy]]&nbsp;leží pri [[Dunaj|Dunaji]].<ref>[[Nitra|Nitre]]</ref>
+[[Tom &amp; Jerry|Toma &amp; Jerryho]] a [[Veľká hora|"Veľkej hore"]] aj [[Malá&nbsp;hora|Malej&nbsp;hore]]
+[[Starý most|starého mosta]] &lt;br&gt; [[Nový most|nového mosta]]'''
+
+
+def _write_dump(file_path, comment=''):
+    # a bz2 copy next to the plain XML dump
+    dump = (f'<mediawiki><page><title>T</title><revision><comment>{escape(comment)}</comment>'
+            f'<text xml:space="preserve">{escape(PAGE_TEXT)}</text></revision></page></mediawiki>\n')
+
+    with open(file_path, 'w', encoding='UTF-8') as dump_file:
+        dump_file.write(dump)
+    with bz2.open(file_path + '.bz2', 'wt', encoding='UTF-8') as dump_file:
+        dump_file.write(dump)
+
+    return file_path
+
+
+def _lemmatize(input_file_path):
+    output_file_path = input_file_path + '.csv'
+    WikiLemmatizer().lemmatize(input_file_path, output_file_path)
+
+    with open(output_file_path, 'r', encoding='UTF-8') as output_file:
+        return output_file.read().splitlines()
+
+
+def test_bz2_dump_decodes_xml_entities(tmp_path):
+    dump_file_path = _write_dump(str(tmp_path / 'skwiki.xml'))
+
+    assert list(read_page_lines(dump_file_path + '.bz2')) == PAGE_TEXT.split('\n')
+
+
+def test_plain_and_bz2_dump_give_same_page_text_output(tmp_path, monkeypatch):
+    # the plain XML lines still carry the XML escaping, normalize_line() decodes both levels of it
+    monkeypatch.chdir(PACKAGE_DIR)
+    dump_file_path = _write_dump(str(tmp_path / 'skwiki.xml'))
+
+    assert _lemmatize(dump_file_path) == _lemmatize(dump_file_path + '.bz2')
+
+
+def test_plain_dump_also_reads_links_outside_page_text(tmp_path, monkeypatch):
+    # the bz2 reader parses the XML and keeps only revision/text, the plain XML is read line by line,
+    # so links in edit summaries, titles etc. are lemmatized only from a plain dump
+    monkeypatch.chdir(PACKAGE_DIR)
+    dump_file_path = _write_dump(str(tmp_path / 'skwiki.xml'), comment='oprava [[Juraj Jánošík|Jánošíka]]')
+
+    plain_lines = _lemmatize(dump_file_path)
+    bz2_lines = _lemmatize(dump_file_path + '.bz2')
+
+    assert 'jánošík|jánošíka' in plain_lines
+    assert 'jánošík|jánošíka' not in bz2_lines
+    assert [line for line in plain_lines if (line not in ('juraj', 'jánošík|jánošíka'))] == bz2_lines
@@ -0,0 +1,117 @@
+import bz2
+import collections
+import multiprocessing
+import xml.etree.ElementTree as ET
+
+
+
+def _get_local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _iter_page_texts_from_events(events):
+    root = None
+    text = None
+
+    for event, element in events:
+        if (event == 'start'):
+            if (root is None):
+                root = element
+            continue
+
+        local_name = _get_local_name(element.tag)
+
+        # only revision/text is needed, title, id etc. are skipped
+        if (local_name == 'text'):
+            text = element.text
+        elif (local_name == 'page'):
+            yield text or ''
+            text = None
+            # drop the finished page so memory does not grow with the dump
+            root.clear()
+
+
+def read_page_texts(input_file_path):
+    opener = bz2.open if (input_file_path.endswith('.bz2')) else open
+
+    with opener(input_file_path, 'rb') as input_file:
+        for text in _iter_page_texts_from_events(ET.iterparse(input_file, events=('start', 'end'))):
+            yield text
+
+
+def read_multistream_offsets(index_file_path):
+    offsets = set()
+    opener = bz2.open if (index_file_path.endswith('.bz2')) else open
+
+    # every line of the multistream index has the format offset:page_id:title
+    with opener(index_file_path, 'rt', encoding='UTF-8') as index_file:
+        for line in index_file:
+            offset = line.split(':', 1)[0]
+            if (offset.isdigit()):
+                offsets.add(int(offset))
+
+    return sorted(offsets)
+
+
+def _decompress_stream(args):
+    input_file_path, start, end = args
+
+    with open(input_file_path, 'rb') as input_file:
+        input_file.seek(start)
+        data = input_file.read(end - start) if (end is not None) else input_file.read()
+
+    return bz2.decompress(data)
+
+
+def _iter_decompressed_streams(pool, stream_args, window_size):
+    # at most window_size streams are decompressed ahead of the parser, so memory stays flat when the parser is slower
+    pending_results = collections.deque()
+
+    for args in stream_args:
+        if (len(pending_results) >= window_size):
+            yield pending_results.popleft().get()
+        pending_results.append(pool.apply_async(_decompress_stream, (args,)))
+
+    while (pending_results):
+        yield pending_results.popleft().get()
+
+
+def _iter_pull_parser_events(data_blocks):
+    parser = ET.XMLPullParser(events=('start', 'end'))
+
+    for data in data_blocks:
+        parser.feed(data)
+        for event in parser.read_events():
+            yield event
+
+    parser.close()
+    for event in parser.read_events():
+        yield event
+
+
+def read_multistream_page_texts(input_file_path, index_file_path, processes=None):
+    offsets = read_multistream_offsets(index_file_path)
+    # the first stream holds the siteinfo header, the last one the closing tag
+    if (not offsets or offsets[0] != 0):
+        offsets.insert(0, 0)
+    stream_args = [(input_file_path, start, end) for start, end in zip(offsets, offsets[1:] + [None])]
+
+    processes = processes or multiprocessing.cpu_count()
+    with multiprocessing.Pool(processes) as pool:
+        # streams are decompressed in parallel and handed to the parser in dump order
+        data_blocks = _iter_decompressed_streams(pool, stream_args, 2 * processes)
+        for text in _iter_page_texts_from_events(_iter_pull_parser_events(data_blocks)):
+            yield text
+
+
+def read_dump_page_texts(input_file_path, index_file_path=None, processes=None):
+    if (index_file_path is not None):
+        return read_multistream_page_texts(input_file_path, index_file_path, processes)
+    return read_page_texts(input_file_path)
+
+
+def read_page_lines(input_file_path, index_file_path=None, processes=None):
+    # the lemmatizer works with the lines of the wikitext, same as with the decompressed dump
+    for text in read_dump_page_texts(input_file_path, index_file_path, processes):
+        for line in text.split('\n'):
+            yield line
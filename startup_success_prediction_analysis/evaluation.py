@@ -0,0 +1,134 @@
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn import metrics
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+
+
+METRIC_NAMES = ('accuracy', 'recall', 'precision', 'f1')
+
+
+def _encode_binary_labels(y, labels):
+    # negative label -> 0, positive label -> 1, bool and float labels compare equal to 0 and 1
+    y = np.asarray(y)
+    is_positive = (y == labels[1])
+    unknown_labels = np.unique(y[~is_positive & (y != labels[0])])
+
+    if (len(unknown_labels) > 0):
+        raise ValueError(f'labels must be one of {tuple(labels)}, found {unknown_labels[:5].tolist()}')
+
+    return is_positive.astype(np.int64)
+
+
+def calc_confusion_matrix(y_true, y_pred, labels=(0, 1)):
+    # binary confusion matrix [[TN, FP], [FN, TP]] in one pass, same layout as metrics.confusion_matrix,
+    # labels are the negative and the positive label
+    y_true = _encode_binary_labels(y_true, labels)
+    y_pred = _encode_binary_labels(y_pred, labels)
+    return np.bincount(2 * y_true + y_pred, minlength=4).reshape(2, 2)
+
+
+def calc_metrics(confusion_matrix):
+    (tn, fp), (fn, tp) = confusion_matrix.tolist()
+
+    # a metric with a zero denominator is 0 like in sklearn.metrics
+    return {
+        'accuracy': (tp + tn) / (tn + fp + fn + tp) if (tn + fp + fn + tp) else 0.0,
+        'recall': tp / (tp + fn) if (tp + fn) else 0.0,
+        'precision': tp / (tp + fp) if (tp + fp) else 0.0,
+        'f1': 2 * tp / (2 * tp + fp + fn) if (tp + fp + fn) else 0.0
+    }
+
+
+def print_metrics(metrics_dict):
+    print(f"Accuracy: {metrics_dict['accuracy']:.4f}")
+    print(f"Recall: {metrics_dict['recall']:.4f}")
+    print(f"Precision: {metrics_dict['precision']:.4f}")
+    print(f"F1: {metrics_dict['f1']:.4f}")
+
+
+class PredictionCache:
+
+    # predictions and positive class probabilities are computed once per (model, dataset)
+    # and shared by the metrics, confusion matrices and plots
+    def __init__(self):
+        self.prediction_dict = {}
+        self.proba_dict = {}
+
+
+    def predict(self, model_name, model, dataset_name, X):
+        key = (model_name, dataset_name)
+        if (key not in self.prediction_dict):
+            self.prediction_dict[key] = np.asarray(model.predict(X))
+        return self.prediction_dict[key]
+
+
+    def predict_proba(self, model_name, model, dataset_name, X):
+        key = (model_name, dataset_name)
+        if (key not in self.proba_dict):
+            self.proba_dict[key] = model.predict_proba(X)[:, 1]
+        return self.proba_dict[key]
+
+
+    def evaluate(self, model_name, model, dataset_name, X, y, threshold=None):
+        # with a threshold the predictions come from the cached probabilities instead of model.predict
+        if (threshold is None):
+            y_pred = self.predict(model_name, model, dataset_name, X)
+        else:
+            y_pred = (self.predict_proba(model_name, model, dataset_name, X) >= threshold).astype(int)
+
+        confusion_matrix = calc_confusion_matrix(y, y_pred)
+        metrics_dict = calc_metrics(confusion_matrix)
+        print_metrics(metrics_dict)
+
+        return (metrics_dict, confusion_matrix)
+
+
+    def clear(self, model_name=None):
+        for cache_dict in (self.prediction_dict, self.proba_dict):
+            for key in [key for key in cache_dict if (model_name is None or key[0] == model_name)]:
+                del cache_dict[key]
+
+
+def _take_rows(data, row_ids):
+    return data.iloc[row_ids] if (hasattr(data, 'iloc')) else data[row_ids]
+
+
+def _run_cross_validation_fold(model_name, model, X, y, fold, train_ids, test_ids):
+    model = clone(model)
+    X_test, y_test = _take_rows(X, test_ids), _take_rows(y, test_ids)
+
+    start_time = time.perf_counter()
+    model.fit(_take_rows(X, train_ids), _take_rows(y, train_ids))
+    fit_seconds = time.perf_counter() - start_time
+
+    result_dict = {'model': model_name, 'fold': fold, **calc_metrics(calc_confusion_matrix(y_test, model.predict(X_test)))}
+    result_dict['roc_auc'] = metrics.roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]) if (hasattr(model, 'predict_proba')) else np.nan
+    result_dict['fit_seconds'] = fit_seconds
+
+    return result_dict
+
+
+def run_cross_validation(model_dict, X, y, n_splits=10, n_jobs=-1, random_state=None, return_fold_results=False):
+    # every (model, fold) pair is a separate job, so the models are fitted in parallel in one process pool,
+    # all models are evaluated on the same folds
+    k_fold = StratifiedKFold(n_splits=n_splits, shuffle=(random_state is not None), random_state=random_state)
+    fold_list = list(k_fold.split(np.zeros(len(y)), y))
+
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_run_cross_validation_fold)(model_name, model, X, y, fold, train_ids, test_ids)
+        for model_name, model in model_dict.items()
+        for fold, (train_ids, test_ids) in enumerate(fold_list))
+    fold_df = pd.DataFrame(fold_results)
+
+    # mean and standard deviation over the folds, np.std like in the notebooks
+    grouped_fold_df = fold_df.drop(columns='fold').groupby('model', sort=False)
+    results_df = pd.concat([grouped_fold_df.mean().add_suffix('_mean'), grouped_fold_df.std(ddof=0).add_suffix('_std')], axis=1)
+    results_df = results_df[[f'{name}_{stat}' for name in (*METRIC_NAMES, 'roc_auc', 'fit_seconds') for stat in ('mean', 'std')]]
+
+    if (return_fold_results):
+        return (results_df, fold_df)
+
+    return results_df
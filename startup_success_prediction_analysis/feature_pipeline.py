@@ -0,0 +1,116 @@
+import os
+import glob
+import hashlib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+
+DATA_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_data.csv')
+# bump after changing the pipeline, so the cached frames of the old pipeline are not used
+PIPELINE_VERSION = 1
+CACHE_FORMATS = ('feather', 'parquet')
+
+# row number, address (city, state code and zip code) and copies of state_code, id and status
+DROPPED_COLUMNS = ['Unnamed: 0', 'Unnamed: 6', 'state_code.1', 'object_id', 'labels']
+CATEGORY_COLUMNS = ['state_code', 'zip_code', 'city', 'category_code']
+DATE_COLUMNS = ['founded_at', 'closed_at', 'first_funding_at', 'last_funding_at']
+COUNT_COLUMNS = ['relationships', 'funding_rounds', 'milestones']
+
+MODEL_FEATURES = ['age_first_funding_year', 'age_last_funding_year', 'relationships', 'funding_rounds',
+                  'funding_total_usd', 'milestones', 'has_VC', 'has_angel', 'has_roundA',
+                  'has_roundB', 'has_roundC', 'has_roundD', 'avg_participants', 'is_top500']
+
+
+def _is_flag_column(column):
+    return column.startswith(('is_', 'has_'))
+
+
+def process_startup_data(df):
+    df = df.drop(columns=[column for column in DROPPED_COLUMNS if (column in df.columns)])
+
+    # the 0/1 is_*/has_* indicator columns
+    flag_columns = [column for column in df.columns if (_is_flag_column(column))]
+    df[flag_columns] = df[flag_columns].astype(bool)
+
+    for column in COUNT_COLUMNS:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    for column in DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column], format='%m/%d/%Y')
+
+    if (not pd.api.types.is_numeric_dtype(df['status'])):
+        df['status'] = df.status.map({'acquired': 1, 'closed': 0}).astype(np.int8)
+    df['funding_total_usd_log'] = np.log(df['funding_total_usd'])
+
+    return df
+
+
+def calc_file_hash(file_path):
+    file_hash = hashlib.sha256()
+
+    with open(file_path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(1024 * 1024), b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+def get_cache_file_path(data_file_path, cache_dir, cache_format):
+    cache_key = f'{calc_file_hash(data_file_path)[:16]}-v{PIPELINE_VERSION}'
+    data_name = os.path.splitext(os.path.basename(data_file_path))[0]
+
+    return os.path.join(cache_dir, f'{data_name}-{cache_key}.{cache_format}')
+
+
+def _write_cache(df, cache_file_path, cache_format):
+    temp_file_path = cache_file_path + '.tmp'
+
+    if (cache_format == 'feather'):
+        df.reset_index(drop=True).to_feather(temp_file_path)
+    else:
+        df.to_parquet(temp_file_path, index=False)
+    os.replace(temp_file_path, cache_file_path)
+
+
+def load_startup_data(data_file_path=DATA_FILE_PATH, cache_dir=None, cache_format='feather', use_cache=True):
+    # the processed frame is cached under the hash of the source file, a changed source file is processed again
+    if (cache_format not in CACHE_FORMATS):
+        raise ValueError(f'cache_format must be one of {CACHE_FORMATS}')
+
+    if (not use_cache):
+        return process_startup_data(pd.read_csv(data_file_path))
+
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(data_file_path)), 'cache')
+    cache_file_path = get_cache_file_path(data_file_path, cache_dir, cache_format)
+
+    if (os.path.exists(cache_file_path)):
+        if (cache_format == 'feather'):
+            return pd.read_feather(cache_file_path)
+        return pd.read_parquet(cache_file_path)
+
+    df = process_startup_data(pd.read_csv(data_file_path))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        _write_cache(df, cache_file_path, cache_format)
+    except ImportError as error:
+        # Feather and Parquet files need pyarrow, without it the frame is processed on every load
+        print(f'load_startup_data() not cached: {error}')
+        return df
+
+    # cached frames of older versions of the source file
+    for stale_file_path in glob.glob(os.path.join(cache_dir, f'{os.path.splitext(os.path.basename(data_file_path))[0]}-*.{cache_format}')):
+        if (stale_file_path != cache_file_path):
+            os.remove(stale_file_path)
+
+    return df
+
+
+def split_train_test(df, features=MODEL_FEATURES, test_size=0.20, random_state=1):
+    # the stratified split of the modeling notebooks
+    X = df[features]
+    y = df['status']
+
+    return train_test_split(X, y, test_size=test_size, stratify=y, random_state=random_state)
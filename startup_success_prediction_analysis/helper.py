@@ -1,12 +1,10 @@
 import numpy as np
-from sklearn import metrics
+from evaluation import calc_confusion_matrix, calc_metrics, print_metrics
 
 
 def evaluate_classifier(y_test, y_pred):
-    print(f'Accuracy: {metrics.accuracy_score(y_test, y_pred):.4f}')
-    print(f'Recall: {metrics.recall_score(y_test, y_pred):.4f}')
-    print(f'Precision: {metrics.precision_score(y_test, y_pred):.4f}')
-    print(f'F1: {metrics.f1_score(y_test, y_pred):.4f}')
+    # all metrics come from one confusion matrix
+    print_metrics(calc_metrics(calc_confusion_matrix(y_test, y_pred)))
 
 
 def print_feature_importances(tree_classifier, X_columns):
@@ -41,10 +41,12 @@ def plot_confusion_matrix(confusion_matrix, figsize):
     plt.title('Confusion matrix')
 
 
-def plot_precision_recall_curve(classifier, X_test, y_test, label, figsize):
+def plot_precision_recall_curve(classifier, X_test, y_test, label, figsize, positive_probas=None):
+    # positive_probas are the cached positive class probabilities of evaluation.PredictionCache
     fig, ax = plt.subplots(figsize=figsize)
-    probas = classifier.predict_proba(X_test)
-    precision, recall, thresholds = metrics.precision_recall_curve(y_test, probas[:, 1])
+    if (positive_probas is None):
+        positive_probas = classifier.predict_proba(X_test)[:, 1]
+    precision, recall, thresholds = metrics.precision_recall_curve(y_test, positive_probas)
     plt.plot(recall, precision, marker='.', label=label)
     plt.xlabel('Recall')
     plt.ylabel('Precision')
@@ -52,9 +54,10 @@ def plot_precision_recall_curve(classifier, X_test, y_test, label, figsize):
     plt.show()
 
 
-def plot_roc_curve(classifier, X_test, y_test):
-    probas = classifier.predict_proba(X_test)
-    fpr, tpr, thresholds = metrics.roc_curve(y_test, probas[:, 1])
+def plot_roc_curve(classifier, X_test, y_test, positive_probas=None):
+    if (positive_probas is None):
+        positive_probas = classifier.predict_proba(X_test)[:, 1]
+    fpr, tpr, thresholds = metrics.roc_curve(y_test, positive_probas)
     roc_auc = metrics.auc(fpr, tpr)
 
     plt.plot(fpr, tpr, label='ROC (area = %0.2f)' % (roc_auc))